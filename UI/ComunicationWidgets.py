@@ -6,16 +6,30 @@ Created on Sat Apr 20 10:06:56 2024
 """
 
 import sys
+from collections import deque
+
 from PyQt5.QtGui import QFont
-from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QTextEdit, QPushButton
+from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QTextEdit, QPushButton, QGraphicsOpacityEffect
 from PyQt5.QtCore import QTimer, QDateTime, QPropertyAnimation, QEasingCurve, pyqtSignal
 
 ### ENABLE DISPLAY TO ACTION HISTORY
+"""
+    ScrollableMessageBox - console with the action history
+    > pending messages are kept in a deque and released once per frame in one insert
+    > a big backlog is drained faster and without the fade animation, no pending message is dropped
+    > retained history is capped, the oldest lines are evicted by the document
+
+"""
 class ScrollableMessageBox(QWidget):
+    FRAME_INTERVAL = 16     # ms between two flushes of the pending messages
+    MAX_BATCH = 200         # messages coalesced into a single insert
+    MAX_HISTORY = 500       # lines kept in the console
+    ANIMATION_BACKLOG = 3   # no fade animation for bigger batches
+
     def __init__(self):
         super().__init__()
+        self.message_queue = deque()
         self.init_ui()
-        self.message_queue = []
 
     def init_ui(self):
         self.setWindowTitle('Scrollable Message Box')
@@ -24,12 +38,25 @@ class ScrollableMessageBox(QWidget):
 
         self.text_edit = QTextEdit(self)
         self.text_edit.setReadOnly(True)
+        self.text_edit.document().setMaximumBlockCount(self.MAX_HISTORY)
         layout.addWidget(self.text_edit)
 
         # Timer for displaying messages from the queue
         self.timer = QTimer(self)
+        self.timer.setInterval(self.FRAME_INTERVAL)
         self.timer.timeout.connect(self.display_next_message)
 
+        # One fade animation reused by every flush, the effect is off while idle
+        self.fade_effect = QGraphicsOpacityEffect(self.text_edit.viewport())
+        self.fade_effect.setEnabled(False)
+        self.text_edit.viewport().setGraphicsEffect(self.fade_effect)
+        self.animation = QPropertyAnimation(self.fade_effect, b"opacity", self)
+        self.animation.setDuration(500)
+        self.animation.setStartValue(0.0)
+        self.animation.setEndValue(1.0)
+        self.animation.setEasingCurve(QEasingCurve.OutQuad)
+        self.animation.finished.connect(lambda: self.fade_effect.setEnabled(False))
+
         self.load_styles_from_file("UI/styles.qss")
 
     def load_styles_from_file(self, file_path):
@@ -44,23 +71,30 @@ class ScrollableMessageBox(QWidget):
         current_time = QDateTime.currentDateTime().toString("yyyy-MM-dd HH:mm:ss")
         self.message_queue.append((current_time, message))
         if not self.timer.isActive():
-            self.timer.start(1000)  # Adjust delay between messages as needed
+            self.timer.start()
 
     def display_next_message(self):
-        if self.message_queue:
-            time, message = self.message_queue.pop(0)
-            self.text_edit.moveCursor(self.text_edit.textCursor().End)
-            self.text_edit.insertPlainText(f"{time}: {message}\n")
-            self.setFocus()
-
-            # Apply fade animation
-            animation = QPropertyAnimation(self.text_edit.viewport(), b"opacity")
-            animation.setDuration(500)
-            animation.setStartValue(0.0)
-            animation.setEndValue(1.0)
-            animation.setEasingCurve(QEasingCurve.OutQuad)
-            animation.start()
-        else:
+        if not self.message_queue:
+            self.timer.stop()
+            return
+
+        batch = min(len(self.message_queue), self.MAX_BATCH)
+        lines = []
+        for _ in range(batch):
+            time, message = self.message_queue.popleft()
+            lines.append(f"{time}: {message}\n")
+
+        self.text_edit.moveCursor(self.text_edit.textCursor().End)
+        self.text_edit.insertPlainText("".join(lines))
+        self.setFocus()
+
+        # Apply fade animation only while the console keeps up with the game
+        if batch <= self.ANIMATION_BACKLOG and not self.message_queue:
+            self.animation.stop()
+            self.fade_effect.setEnabled(True)
+            self.animation.start()
+
+        if not self.message_queue:
             self.timer.stop()
 
 ### HINTS AREA
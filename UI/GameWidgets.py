@@ -6,8 +6,6 @@ Created on Fri Apr 19 16:15:36 2024
 """
 
 import sys
-import random
-import numpy as np
 
 from PyQt5.QtCore import Qt, QTimer, QSize, pyqtSignal
 from PyQt5.QtWidgets import QApplication, QVBoxLayout, QWidget, QLabel, QPushButton, QGridLayout, QHBoxLayout
@@ -16,7 +14,9 @@ from PyQt5.QtGui import QPainter, QBrush, QColor, QFont
 
 from UI.DataCollector import *
 from UI.UI_Elements import ShipPlacementButton, AbilityPlacementButtons
-from UI.ModuleWidgets import InfoWidget
+from game_placement import FleetGenerator, ENEMY_FLEET, ship_cells
+from game_bitboard import Bitboard, scan_radius
+from game_registry import ShipRegistry
 
 
 
@@ -26,10 +26,14 @@ from UI.ModuleWidgets import InfoWidget
     > init ground with bunch of buttons and connect each button with place_item
     > keep in focus one ship to be placed and check for condition if it can be placed
     > will use 'isShipPlaced' property to know if a button/cell on the map is already assigned
+    > keep a Bitboard next to the data matrices, so cell checks are done with bit masks
+    > keep a ShipRegistry of the ships placed, every attack updates it and it tells when ships sink
 
 """
 class TerrainWidget(QWidget):
     signal_decrese_count = pyqtSignal(int)
+    signal_ship_placed = pyqtSignal(int, int, int, int, int)    # x, y, size, orientation, id
+    signal_ability_used = pyqtSignal(int, int, int, int)        # ability, x, y, result
     def __init__(self, parent=None):
         super().__init__(parent)
         self.selected_ship:Ship = None
@@ -38,8 +42,11 @@ class TerrainWidget(QWidget):
         self.grid_size = 40
         self.squares = 10
         self.id_count = 0
+        self.difficulty = 1
         self.init_ui()
         self.data = self.init_data(10,10)
+        self.board = Bitboard(self.squares)
+        self.registry = ShipRegistry(self.squares)
 
     def init_ui(self):
         layout = QGridLayout(self)
@@ -62,12 +69,8 @@ class TerrainWidget(QWidget):
             self.buttons.append(row)
 
     def init_data(self, W, H):
-        matrix_state = np.zeros((W,H),dtype=int)
-        for w in range(W):
-            for h in range(H):
-                matrix_state[w][h] = MapState.SPACE_FREE.value
-
-        matrix_ids = np.zeros((W,H),dtype=int)
+        matrix_state = [[MapState.SPACE_FREE.value] * H for _ in range(W)]
+        matrix_ids = [[0] * H for _ in range(W)]
         matrix = {
             "state": matrix_state,
             "ids": matrix_ids
@@ -138,42 +141,66 @@ class TerrainWidget(QWidget):
         x, y = self.selected_ability.refX, self.selected_ability.refY
         print(f"O abilitate a fost plasată la poziția {x},{y}")
 
+        result = 0
+        attacked = self.board.attacked
         if self.selected_ability.id == 1:
-            self.place_bomb(x, y)
+            result = int(self.place_bomb(x, y))
         elif self.selected_ability.id == 2:
-            self.place_scan(x, y)
+            result = self.place_scan(x, y)
         elif self.selected_ability.id == 3:
-            self.place_line_assault(x, y)
-
+            result = self.place_line_assault(x, y)
+        # the move is logged before the registry can end the game on it
+        self.signal_ability_used.emit(self.selected_ability.id, x, y, result)
+        self.registry.record(self.board.attacked & ~attacked)
         self.parentWidget().setCursor(Qt.ArrowCursor)
         self.signal_decrese_count.emit(self.selected_ability.id)
         self.selected_ability = None
 
     def place_bomb(self, x, y):
+        hit = self.board.bomb(x, y)
+        self.mark_attacked(x, y, hit)
+        self.parentWidget().can_act = hit
+        return hit
+
+    def mark_attacked(self, x, y, hit):
         button = self.buttons[x][y]
         button.setEnabled(False)
-        new_style = "color: red; font-size: 30px; font-weight: bold;" if self.data["ids"][x][y] != 0 else "color: #5D3FD3;"
+        new_style = "color: red; font-size: 30px; font-weight: bold;" if hit else "color: #5D3FD3;"
         button.setStyleSheet(new_style)
         button.setText("X")
-        self.data["state"][x][y] = MapState.SPACE_ATTACKED.value if self.data["ids"][x][y]==0 else MapState.SHIP_ATTACKED.value
-        self.parentWidget().can_act = True if self.data["state"][x][y] == MapState.SHIP_ATTACKED.value else False
+        self.data["state"][x][y] = MapState.SHIP_ATTACKED.value if hit else MapState.SPACE_ATTACKED.value
+
+    def set_difficulty(self, difficulty:int):
+        self.difficulty = int(difficulty)
 
     def place_scan(self, x, y):
-        info = InfoWidget.get_instance()
-        difficulty = info.current_level
-        area = 4 - difficulty
-        for i in range(max(x-area,0), min(x+area+1,10)):
-            for j in range(max(y-area,0), min(y+area+1,10)):
-                new_style = "color: yellow; font-size: 30px; font-weight: bold;" if self.data["ids"][i][j] != 0 else "color: gray;"
-                self.buttons[i][j].setStyleSheet(new_style)
-                self.buttons[i][j].setText("?")
+        # same count as apply_move: the ship cells not attacked yet, the attacked cells keep their X
+        radius = scan_radius(self.difficulty)
+        window = self.board.geometry.window_mask(x, y, radius) & ~self.board.attacked
+        found = self.board.scan(x, y, radius)
+        for i, j in self.board.geometry.iter_cells(window):
+            new_style = "color: gray;"
+            self.buttons[i][j].setStyleSheet(new_style)
+            self.buttons[i][j].setText("?")
+        for i, j in self.board.geometry.iter_cells(found):
+            new_style = "color: yellow; font-size: 30px; font-weight: bold;"
+            self.buttons[i][j].setStyleSheet(new_style)
+        return bin(found).count("1")
 
     def place_line_assault(self, x, y):
-        for i in range(self.squares):
-            self.place_bomb(x,i)
+        # the row is attacked once on the Bitboard, only its new cells are marked, hit or not from the mask
+        row = self.board.geometry.row_masks[x] & ~self.board.attacked
+        hits = self.board.line_attack(x)
+        for i, j in self.board.geometry.iter_cells(row):
+            self.mark_attacked(i, j, bool(hits & self.board.geometry.cell_mask(i, j)))
+        self.parentWidget().can_act = bool(hits)
+        return bin(hits).count("1")
 
     def update_matrix(self,x,y,size,orientation):
         self.id_count += 1
+        self.board.place(x, y, size, orientation, self.id_count)
+        self.registry.add_ship(self.id_count, self.board.ship_masks[self.id_count])
+        self.signal_ship_placed.emit(x, y, size, orientation, self.id_count)
         if orientation == self.selected_ship.VERTICAL:
             for i in range(size):
                 self.data["state"][x+i][y] = MapState.SHIP_PLACED.value
@@ -225,25 +252,14 @@ class TerrainWidget(QWidget):
             return False
 
         # check for not covering other ships already placed
-        size = ship.size
-        row, col = ship.refX, ship.refY
-        orientation = ship.orientation
-        # print(f"size={size}, row={row}, col={col}, orientation={orientation}")
+        mask = self.board.geometry.placement_mask(ship.refX, ship.refY, ship.size, ship.orientation)
+        if mask is None:
+            return False
 
-        if orientation == Ship.HORIZONTAL:
-            if col + size - 1 >= self.squares:
-                return False
-            for i in range(size):
-                if self.buttons[row][col + i].property("isShipPlaced") == "yes" :
-                    self.parentWidget().addMessageToConsole.emit(f"A apărut o coliziune cu altă navă la poziția {row},{col+i}")
-                    return False
-        else:
-            if row + size - 1 >= self.squares:
-                return False
-            for i in range(size - 1):
-                if self.buttons[row + i][col].property("isShipPlaced") == "yes":
-                    self.parentWidget().self.addMessageToConsole.emit(f"A apărut o coliziune cu altă navă la poziția {row+i},{col}")
-                    return False
+        collision = self.board.geometry.first_cell(mask & self.board.ships)
+        if collision is not None:
+            self.parentWidget().addMessageToConsole.emit(f"A apărut o coliziune cu altă navă la poziția {collision[0]},{collision[1]}")
+            return False
 
         return True
 
@@ -257,6 +273,7 @@ class TerrainWidget(QWidget):
 class UserTerrainWidget(QWidget):
     signal_all_ships_placed = pyqtSignal()  # will be used later to start the game
     addMessageToConsole = pyqtSignal(str)
+    signal_system_attack = pyqtSignal(int, int, int, int)    # ability, x, y, result
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -342,26 +359,36 @@ class UserTerrainWidget(QWidget):
             width, height = self.terrain_widget.selected_ship.get_size_px()
             self.setCursor(QCursor(QPixmap(self.terrain_widget.selected_ship.image_path).scaled(width, height), -1, -1))
 
-    def get_changed_indices(old_matrix, new_matrix):
-        changes = []
-        old_state = old_matrix["state"]
-        new_state = new_matrix["state"]
-        
-        for i in range(len(old_state)):
-            for j in range(len(old_state[i])):
-                if old_state[i][j] != new_state[i][j]:
-                    changes.append((i, j))
-        
-        return changes
-
-    def update_map_from_file(self, matrix:dict):
-        changes = self.get_changed_indices(self.terrain_widget.data, matrix)
-        for i, j in changes:
-            self.update_ui_at_index(i, j, matrix["state"][i][j])
-
+    def update_map_from_file(self, matrix:dict, moves=None, board=None):
+        # the terrain written by the rule base; board: the Bitboard of the matrix when the caller has it
+        board = board or Bitboard.from_matrix(matrix)
+        changes = board.attacked ^ self.terrain_widget.board.attacked
         self.terrain_widget.data = matrix
+        self.terrain_widget.board = board
+        self.show_system_attacks(changes, moves)
+
+    def update_map_from_board(self, attacked, moves=None):
+        # the Bitboard of the terrain was attacked in place, attacked: its attacked cells before the moves;
+        # only the cells that changed are written in the matrix
+        terrain = self.terrain_widget
+        changes = terrain.board.attacked & ~attacked
+        for i, j in terrain.board.geometry.iter_cells(changes):
+            terrain.data["state"][i][j] = terrain.board.state_at(i, j)
+        self.show_system_attacks(changes, moves)
+
+    def show_system_attacks(self, changes, moves=None):
+        # moves: (ability id, x, y, result) of the system turn when known, else every cell attacked is a bomb
+        board = self.terrain_widget.board
+        for i, j in board.geometry.iter_cells(changes):
+            self.update_ui_at_index(i, j, board.state_at(i, j))
+        if moves is None:
+            moves = [(1, i, j, int(board.ships & board.geometry.cell_mask(i, j) != 0)) for i, j in board.geometry.iter_cells(changes)]
+        for move in moves:
+            self.signal_system_attack.emit(*move)
+        self.terrain_widget.registry.record(changes & board.attacked)
 
     def update_ui_at_index(self, i, j, new_state):
+        new_state = MapState(new_state)
         if new_state == MapState.SHIP_ATTACKED:
             self.terrain_widget.buttons[i][j].setStyleSheet("color: red; font-size: 30px; font-weight: bold;")
             self.terrain_widget.buttons[i][j].setText("X")
@@ -379,10 +406,11 @@ class UserTerrainWidget(QWidget):
 
 """
 class EnemyTerrainWidget(QWidget):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, seed=None):
         super().__init__(parent)
         self.setObjectName("EnemyTerrainWidget")
         self.can_act = True
+        self.fleet_generator = FleetGenerator(seed=seed)
         self.init_ui()
 
     def init_ui(self):
@@ -424,51 +452,16 @@ class EnemyTerrainWidget(QWidget):
 
     # algo place ships
     def init_ships(self):
-        sizes = [4,3,3,2,2,2,1,1,1]
-        id_ship_to_place = 0
-        for s in sizes:
-            x, y, o = self.select_random_ref_position(s)
-            if (x, y, o) != (None, None, None):
-                id_ship_to_place += 1
-                self.place_ship_on_matrix(x, y, s, o, id_ship_to_place)
-                # print(self.terrain_widget.data["ids"])
-            else:
-                print("Cannot place ship of size", s)
-
-    def select_random_ref_position(self, size):
-        orientation = random.choice([Ship.HORIZONTAL, Ship.VERTICAL])
-        for _ in range(1000):  # Attempt a maximum of 1000 times to find a valid position
-            x = random.randint(0, 9)
-            y = random.randint(0, 9)
-            if self.is_valid_position(x, y, size, orientation):
-                return x, y, orientation
-        return None, None, None
-
-    def is_valid_position(self, x, y, sizes, orientation):
-        # print(x,y,sizes)
-        if orientation == Ship.HORIZONTAL:
-            for i in range(sizes):
-                if x + i >= self.terrain_widget.squares:
-                    return False
-                if self.terrain_widget.data["ids"][x + i][y]:
-                    return False
-        else:
-            for i in range(sizes):
-                if y + i >= self.terrain_widget.squares:
-                    return False
-                if self.terrain_widget.data["ids"][x][y + i]:
-                    return False
-        return True
+        self.fleet_layout = self.fleet_generator.generate(ENEMY_FLEET)
+        for ship_id, (x, y, size, orientation) in enumerate(self.fleet_layout, start=1):
+            self.place_ship_on_matrix(x, y, size, orientation, ship_id)
 
     def place_ship_on_matrix(self, x, y, sizes, orientation, ship_id):
-        if orientation == 'horizontal':
-            for i in range(sizes):
-                self.terrain_widget.data["state"][min(x + i,9)][y] = MapState.SHIP_PLACED.value
-                self.terrain_widget.data["ids"][min(x + i,9)][y] = ship_id
-        else:
-            for i in range(sizes):
-                self.terrain_widget.data["state"][x][min(y + i,9)] = MapState.SHIP_PLACED.value
-                self.terrain_widget.data["ids"][x][min(y + i,9)] = ship_id
+        self.terrain_widget.board.place(x, y, sizes, orientation, ship_id)
+        self.terrain_widget.registry.add_ship(ship_id, self.terrain_widget.board.ship_masks[ship_id])
+        for i, j in ship_cells(x, y, sizes, orientation):
+            self.terrain_widget.data["state"][i][j] = MapState.SHIP_PLACED.value
+            self.terrain_widget.data["ids"][i][j] = ship_id
 
     def drop_ability(self, id_ability:int):
         self.terrain_widget.selected_ability = Ability(id_ability)
@@ -15,6 +15,9 @@ from UI.ComunicationWidgets import ScrollableMessageBox, InfoWidget
 from UI.GameWidgets import UserTerrainWidget, EnemyTerrainWidget
 
 from UI.DataCollector import GameState
+from game_history import MoveHistory, history_filename, JUCATOR, SISTEM
+from game_seed import new_game_seed, derive_seed, FLEET
+from game_registry import SUNK, GAME_OVER
 
 ### STARTS SCENE
 class StartGameWidget(QWidget):
@@ -90,15 +93,19 @@ class StartGameWidget(QWidget):
 class GamePlayWidget(QWidget):
     signal_rearm_start_button = pyqtSignal()
     signal_update_clips_map_request = pyqtSignal(dict)
+    signal_game_over = pyqtSignal(str)     # win / lose
 
-    def __init__(self):
+    def __init__(self, seed=None):
         # init game widgets
         super().__init__()
         print("GamePlayWidget created...")
+        self.seed = new_game_seed() if seed is None else seed
         self.user_widget = UserTerrainWidget()
-        self.enemy_widget = EnemyTerrainWidget()
+        self.enemy_widget = EnemyTerrainWidget(seed=derive_seed(self.seed, FLEET))
         self.message_area_widget = ScrollableMessageBox()
         self.info_widget = InfoWidget()
+        self.history = MoveHistory(history_filename(self.seed), seed=self.seed)
+        self.history.record_fleet(SISTEM, self.enemy_widget.fleet_layout)
 
         # init layouts
         layout = QVBoxLayout(self)
@@ -126,6 +133,35 @@ class GamePlayWidget(QWidget):
 
         self.info_widget.start_button.clicked.connect(self.deactivate_enemy_terrain)
 
+        self.user_widget.terrain_widget.signal_ship_placed.connect(self.record_user_ship)
+        self.user_widget.signal_system_attack.connect(self.record_system_attack)
+        self.enemy_widget.terrain_widget.signal_ability_used.connect(self.record_user_ability)
+        self.user_widget.terrain_widget.registry.add_listener(self.on_user_fleet_event)
+        self.enemy_widget.terrain_widget.registry.add_listener(self.on_enemy_fleet_event)
+
+    def record_user_ship(self, x, y, size, orientation, ship_id):
+        self.history.record_ship(JUCATOR, x, y, size, orientation, ship_id)
+
+    def record_user_ability(self, ability, x, y, result):
+        self.history.append(JUCATOR, ability, x, y, result)
+
+    def record_system_attack(self, ability, x, y, result):
+        self.history.append(SISTEM, ability, x, y, result)
+        self.history.flush()
+
+    def on_user_fleet_event(self, event, ship_id, size):
+        if event == SUNK:
+            self.decrease_ship_info(size)
+            self.addMessage(f"Nava ta N{ship_id} de nivel {size} a fost distrusă!")
+        elif event == GAME_OVER:
+            self.signal_game_over.emit("lose")
+
+    def on_enemy_fleet_event(self, event, ship_id, size):
+        if event == SUNK:
+            self.addMessage(f"Ai distrus o navă inamică de nivel {size}!")
+        elif event == GAME_OVER:
+            self.signal_game_over.emit("win")
+
     def addMessage(self, message):
         self.message_area_widget.add_message(message)
 
@@ -135,6 +171,7 @@ class GamePlayWidget(QWidget):
 
     def set_difficulty(self, dif):
         self.info_widget.set_difficulty(dif)
+        self.enemy_widget.terrain_widget.set_difficulty(dif)
 
     def activate_enemy_terrain(self):
         self.enemy_widget.setEnabled(True)
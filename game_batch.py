@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Nov  3 10:12:37 2026
+
+@authors: Catalin.BUTACU, Serban.VICOL, Nicu.TARADACIUC
+"""
+
+# LIBS
+import time
+
+import numpy as np
+
+from game_bitboard import Bitboard, get_geometry, scan_radius
+from game_history import BOMB, SCAN, LINE_ATTACK
+from game_placement import ENEMY_FLEET, MAX_RESTARTS
+from game_registry import ShipRegistry
+from game_strategy import apply_move, HuntTargetStrategy, Move
+from game_strategy import BOMB as MOVE_BOMB, SCAN as MOVE_SCAN, LINE_ATTACK as MOVE_LINE_ATTACK
+
+# GLOBALS
+BATCH_GAMES = 4096
+NO_MOVE = 0           # ability of the games that are over, the step leaves them as they are
+
+# the abilities of a Move and their numbers in the batch, the same numbers as the history log
+ABILITY_CODES = {MOVE_BOMB: BOMB, MOVE_SCAN: SCAN, MOVE_LINE_ATTACK: LINE_ATTACK}
+CODE_ABILITIES = {code: ability for ability, code in ABILITY_CODES.items()}
+
+
+# HELPERS
+def mask_array(masks, cells:int):
+    # bit masks as rows of booleans, cell index order
+    data = np.frombuffer(b"".join(mask.to_bytes((cells + 7) // 8, "little") for mask in masks), np.uint8)
+    return np.unpackbits(data.reshape(len(masks), -1), axis=1, bitorder="little")[:, :cells].astype(bool)
+
+def neighbours(cells, horizontal:bool):
+    # cells next to the marked ones on the same row (horizontal) or column, on (games, squares, squares)
+    result = np.zeros_like(cells)
+    if horizontal:
+        result[:, :, 1:] |= cells[:, :, :-1]
+        result[:, :, :-1] |= cells[:, :, 1:]
+    else:
+        result[:, 1:] |= cells[:, :-1]
+        result[:, :-1] |= cells[:, 1:]
+    return result
+
+def pick(rng, candidates):
+    # one cell per game, uniform between the candidates; a game without candidates gets cell 0,
+    # hunt_target leaves none only to the games without free cells, which are over and step NO_MOVE
+    keys = rng.random(candidates.shape)
+    keys[~candidates] = -1
+    return keys.argmax(axis=1)
+
+
+"""
+    BatchGames - VECTORIZED TERRAINS
+    > K terrains as stacked arrays: the ship id of every cell, the attacked cells, the cells left
+      of every ship; a step resolves one move in every game at once
+    > same rules as the Bitboard behind TerrainWidget: a bomb hits a ship cell (again too), a line
+      attack counts the new hits of the row, a scan counts the ship cells not attacked in the window
+      of the difficulty
+    > fleets are placed like FleetGenerator: each ship uniform between all its placements, the
+      games where two ships overlap draw their whole layout again
+    > hunt_target() is HuntTargetStrategy for all the games, check_bitboard / check_golden compare
+      the batch with the Bitboard and with the recorded CLIPS games
+
+"""
+class BatchGames:
+    def __init__(self, games:int=BATCH_GAMES, squares:int=10, fleet=ENEMY_FLEET, seed=None, place:bool=True):
+        self.geometry = get_geometry(squares)
+        self.squares = squares
+        self.games = games
+        self.rng = np.random.default_rng(seed)
+        self.sizes = np.array(fleet, np.int16)
+        self.ship_ids = np.zeros((games, self.geometry.cells), np.int8)   # 0 is sea, ship i is fleet[i - 1]
+        self.attacked = np.zeros((games, self.geometry.cells), bool)
+        self.remaining = np.tile(self.sizes, (games, 1))
+        self.moves = np.zeros(games, np.int32)
+        self.parity = mask_array(self.geometry.parity_masks, self.geometry.cells)
+        self.windows = {}
+        if place:
+            self.place_fleets()
+
+    @classmethod
+    def from_boards(cls, boards):
+        # the fleets of Bitboards, ship ids kept; the attacked cells too
+        geometry = boards[0].geometry
+        fleet = [0] * max(max(board.ship_masks) for board in boards)
+        for board in boards:
+            for ship_id, mask in board.ship_masks.items():
+                fleet[ship_id - 1] = bin(mask).count("1")
+        batch = cls(len(boards), geometry.squares, fleet, place=False)
+        for ship_id in range(1, len(fleet) + 1):
+            masks = mask_array([board.ship_masks.get(ship_id, 0) for board in boards], geometry.cells)
+            batch.ship_ids[masks] = ship_id
+        batch.attacked[:] = mask_array([board.attacked for board in boards], geometry.cells)
+        for ship_id in range(1, len(fleet) + 1):
+            batch.remaining[:, ship_id - 1] = ((batch.ship_ids == ship_id) & ~batch.attacked).sum(axis=1)
+        return batch
+
+    def placement_table(self, size:int):
+        return mask_array([mask for _, _, _, mask in self.geometry.get_placements(size)], self.geometry.cells)
+
+    def place_fleets(self):
+        tables = {size: self.placement_table(size) for size in set(self.sizes.tolist())}
+        todo = np.arange(self.games)
+        for _ in range(MAX_RESTARTS):
+            occupied = np.zeros((len(todo), self.geometry.cells), bool)
+            ship_ids = np.zeros((len(todo), self.geometry.cells), np.int8)
+            stuck = np.zeros(len(todo), bool)
+            for ship_id, size in enumerate(self.sizes.tolist(), start=1):
+                table = tables[size]
+                chosen = table[self.rng.integers(len(table), size=len(todo))]
+                stuck |= (occupied & chosen).any(axis=1)
+                occupied |= chosen
+                ship_ids[chosen] = ship_id
+            placed = todo[~stuck]
+            self.ship_ids[placed] = ship_ids[~stuck]
+            todo = todo[stuck]
+            if not len(todo):
+                return
+        raise ValueError(f"Fleet {tuple(self.sizes.tolist())} doesn't fit on a {self.squares}x{self.squares} terrain")
+
+    def scan_windows(self, difficulty:int):
+        radius = scan_radius(difficulty)
+        if radius not in self.windows:
+            self.windows[radius] = mask_array(self.geometry.windows[radius], self.geometry.cells)
+        return self.windows[radius]
+
+    # STATE
+    @property
+    def done(self):
+        return ~self.remaining.any(axis=1)
+
+    def sunk_cells(self):
+        sunk = np.zeros((self.games, len(self.sizes) + 1), bool)
+        sunk[:, 1:] = self.remaining == 0
+        return np.take_along_axis(sunk, self.ship_ids.astype(np.intp), axis=1)
+
+    def hits(self):
+        return self.attacked & (self.ship_ids > 0)
+
+    # MOVES
+    def step(self, abilities, rows, cols, difficulty:int=2):
+        # one move per game, NO_MOVE for the games that sit out; returns the result of every move, what
+        # apply_move gives for the same move on a Bitboard
+        results = np.zeros(self.games, np.int16)
+        cells = rows * self.squares + cols
+
+        games = np.flatnonzero(abilities == BOMB)
+        if len(games):
+            cell = cells[games]
+            ship_id = self.ship_ids[games, cell]
+            fresh = (ship_id > 0) & ~self.attacked[games, cell]
+            self.remaining[games[fresh], ship_id[fresh] - 1] -= 1
+            self.attacked[games, cell] = True
+            results[games] = ship_id > 0
+
+        games = np.flatnonzero(abilities == LINE_ATTACK)
+        if len(games):
+            line = rows[games, None] * self.squares + np.arange(self.squares)
+            ship_id = self.ship_ids[games[:, None], line]
+            fresh = (ship_id > 0) & ~self.attacked[games[:, None], line]
+            where, _ = np.nonzero(fresh)
+            np.subtract.at(self.remaining, (games[where], ship_id[fresh] - 1), 1)
+            self.attacked[games[:, None], line] = True
+            results[games] = fresh.sum(axis=1)
+
+        games = np.flatnonzero(abilities == SCAN)
+        if len(games):
+            window = self.scan_windows(difficulty)[cells[games]]
+            results[games] = (window & (self.ship_ids[games] > 0) & ~self.attacked[games]).sum(axis=1)
+
+        self.moves[abilities != NO_MOVE] += 1
+        return results
+
+    def hunt_target(self):
+        # (rows, cols) of HuntTargetStrategy for every game: next to the hits of ships afloat, along the
+        # line of two aligned hits first, else a random cell of the first checkerboard with free cells
+        shape = (self.games, self.squares, self.squares)
+        free = ~self.attacked
+        open_hits = (self.hits() & ~self.sunk_cells()).reshape(shape)
+        horizontal, vertical = neighbours(open_hits, True), neighbours(open_hits, False)
+        along = (neighbours(open_hits & horizontal, True) | neighbours(open_hits & vertical, False)).reshape(free.shape) & free
+        around = (horizontal | vertical).reshape(free.shape) & free
+        candidates = np.where(along.any(axis=1, keepdims=True), along, around)
+        for parity in self.parity:
+            candidates = np.where(candidates.any(axis=1, keepdims=True), candidates, free & parity)
+        cells = pick(self.rng, candidates)
+        return cells // self.squares, cells % self.squares
+
+    def play_hunt_target(self, max_moves=None):
+        # every game to the end, returns the number of moves of each one
+        limit = max_moves or self.geometry.cells
+        bombs = np.full(self.games, BOMB, np.int8)
+        for _ in range(limit):
+            done = self.done
+            if done.all():
+                break
+            rows, cols = self.hunt_target()
+            self.step(np.where(done, NO_MOVE, bombs), rows, cols)
+        return self.moves.copy()
+
+    def board(self, game:int):
+        # the Bitboard of one game, for the checks
+        board = Bitboard(self.squares)
+        for ship_id in range(1, len(self.sizes) + 1):
+            cells = np.flatnonzero(self.ship_ids[game] == ship_id)
+            if len(cells):
+                board.place_ship(ship_id, sum(1 << int(cell) for cell in cells))
+        board.set_attacked(sum(1 << int(cell) for cell in np.flatnonzero(self.attacked[game])))
+        return board
+
+
+# CHECKS
+"""
+    ExpectedChoice
+    > stands for the random stream of HuntTargetStrategy: the move of the batch must be one of the
+      candidates the strategy draws from, and is the one it gets
+
+"""
+class ExpectedChoice:
+    def __init__(self):
+        self.expected = None
+
+    def choice(self, candidates):
+        if self.expected not in candidates:
+            raise AssertionError(f"{self.expected} is not a hunt/target candidate")
+        return self.expected
+
+def check_bitboard(games:int=200, seed:int=0, difficulty:int=2, mixed:float=0.2):
+    # batch games against the Bitboard and the ShipRegistry of TerrainWidget, move by move; a share of
+    # the moves are scans and line attacks, the bombs must be moves HuntTargetStrategy could make
+    batch = BatchGames(games, seed=seed)
+    boards = [batch.board(game) for game in range(games)]
+    registries = [ShipRegistry.from_board(board) for board in boards]
+    strategy = HuntTargetStrategy()
+    strategy.rng = ExpectedChoice()
+    rng = np.random.default_rng(seed)
+    moves = 0
+    while not batch.done.all():
+        done = batch.done
+        rows, cols = batch.hunt_target()
+        abilities = rng.choice([SCAN, LINE_ATTACK], games)
+        abilities[rng.random(games) >= mixed] = BOMB
+        abilities[done] = NO_MOVE
+        for game in np.flatnonzero(abilities == BOMB):
+            strategy.rng.expected = (int(rows[game]), int(cols[game]))
+            strategy.next_move(boards[game], difficulty)
+        results = batch.step(abilities, rows, cols, difficulty)
+        sunk = batch.sunk_cells()
+        for game in np.flatnonzero(~done):
+            board, registry = boards[game], registries[game]
+            attacked = board.attacked
+            move = Move(CODE_ABILITIES[int(abilities[game])], int(rows[game]), int(cols[game]))
+            expected = apply_move(board, move, difficulty)
+            if expected != results[game]:
+                raise AssertionError(f"Game {game}: {move} gives {results[game]} in the batch, not {expected}")
+            registry.record(board.attacked & ~attacked)
+            if batch.board(game).attacked != board.attacked or registry.game_over != batch.done[game]:
+                raise AssertionError(f"Game {game}: terrain differs after {move}")
+            if sum(1 << int(cell) for cell in np.flatnonzero(sunk[game])) != board.sunk_mask():
+                raise AssertionError(f"Game {game}: sunk ships differ after {move}")
+            moves += 1
+    return moves
+
+def check_golden(file_name:str):
+    # the moves of a golden trace (CLIPS or hunt/target) played on the batch, all games in step;
+    # every result must be the recorded one and every game must end on its last move
+    from game_golden import load_golden, fleet_board
+    header, games = load_golden(file_name)
+    batch = BatchGames.from_boards([fleet_board(game["seed"]) for game in games])
+    longest = max(len(game["moves"]) for game in games)
+    moves = np.zeros((longest, len(games), 4), np.int16)
+    for index, game in enumerate(games):
+        for turn, (ability, row, col, result) in enumerate(game["moves"]):
+            moves[turn, index] = ABILITY_CODES[ability], row, col, result
+    for turn in range(longest):
+        abilities, rows, cols, expected = moves[turn].T
+        results = batch.step(abilities, rows, cols, header["difficulty"])
+        wrong = np.flatnonzero((abilities != NO_MOVE) & (results != expected))
+        if len(wrong):
+            raise AssertionError(f"Game {games[wrong[0]]['seed']}: move {turn} gives {results[wrong[0]]}, recorded {expected[wrong[0]]}")
+    lengths = np.array([len(game["moves"]) for game in games])
+    if not batch.done.all() or (batch.moves != lengths).any():
+        raise AssertionError(f"{file_name}: the batch games don't end with the recorded ones")
+    return int(lengths.sum())
+
+
+# LOCAL MAIN
+if __name__ == "__main__":
+    import sys
+    command = sys.argv[1] if len(sys.argv) > 1 else "play"
+    start = time.perf_counter()
+    if command == "play":
+        games = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+        batch_games = int(sys.argv[3]) if len(sys.argv) > 3 else BATCH_GAMES
+        run_seed = int(sys.argv[4]) if len(sys.argv) > 4 else 0
+        rng = np.random.default_rng(run_seed)
+        total = 0
+        played = 0
+        while played < games:
+            batch = BatchGames(min(batch_games, games - played), seed=rng.integers(1 << 63))
+            total += int(batch.play_hunt_target().sum())
+            played += batch.games
+        elapsed = time.perf_counter() - start
+        print(f"hunt_target: {total / games:.1f} moves/game, {games / elapsed:.0f} games/s ({games / elapsed * 3600 / 1e6:.1f}M games/hour)")
+    elif command == "check":
+        games = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+        print(f"bitboard: {check_bitboard(games)} moves of {games} games match")
+        for file_name in sys.argv[3:] or ["golden/clips_level2.jsonl.gz", "golden/hunt_target_level1.jsonl.gz"]:
+            print(f"{file_name}: {check_golden(file_name)} moves match")
+        print(f"{time.perf_counter() - start:.1f}s")
+    else:
+        raise SystemExit(f"Unknown command {command}, use play or check")
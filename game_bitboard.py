@@ -0,0 +1,382 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 09:14:52 2026
+
+@authors: Catalin.BUTACU, Serban.VICOL, Nicu.TARADACIUC
+"""
+
+# LIBS
+import random
+from functools import lru_cache
+
+from UI.DataCollector import MapState, Ship
+
+# GLOBALS
+MAX_CELLS = 128
+DIFFICULTIES = (1, 2, 3)
+
+# the 8 symmetries of a square terrain, (x, y) -> (x', y') with n = squares - 1
+SYMMETRIES = (
+    lambda x, y, n: (x, y),          # identity
+    lambda x, y, n: (y, n - x),      # rotation 90
+    lambda x, y, n: (n - x, n - y),  # rotation 180
+    lambda x, y, n: (n - y, x),      # rotation 270
+    lambda x, y, n: (x, n - y),      # mirror left-right
+    lambda x, y, n: (n - x, y),      # mirror up-down
+    lambda x, y, n: (y, x),          # transpose
+    lambda x, y, n: (n - y, n - x),  # anti-transpose
+)
+# symmetries that keep rows as rows, a line attack can only be mapped through these
+ROW_SYMMETRIES = (0, 2, 4, 5)
+
+# fixed seed, the same terrain gets the same hash in every run
+ZOBRIST_SEED = 0x5A0B
+ZOBRIST_BITS = 64
+
+
+"""
+    BoardGeometry
+    > precomputed bit masks for a square terrain: cells, rows, columns, ship placements, scan windows
+    > cell (x, y) is the bit x * squares + y, the same indexing as the "state"/"ids" matrices
+    > one instance per terrain size, shared through get_geometry
+    > scan windows and frontiers of every difficulty are built once, when the geometry is created
+    > 64-bit Zobrist keys for every cell: ship placed, cell attacked, ship hit
+
+"""
+class BoardGeometry:
+    def __init__(self, squares:int=10):
+        if squares * squares > MAX_CELLS:
+            raise ValueError(f"A {squares}x{squares} terrain doesn't fit in {MAX_CELLS} bits")
+        self.squares = squares
+        self.cells = squares * squares
+        self.full = (1 << self.cells) - 1
+        self.cell_masks = [1 << i for i in range(self.cells)]
+        self.row_masks = [((1 << squares) - 1) << (x * squares) for x in range(squares)]
+        self.col_masks = [sum(1 << (x * squares + y) for x in range(squares)) for y in range(squares)]
+        self.parity_masks = [sum(1 << i for i in range(self.cells) if sum(divmod(i, squares)) % 2 == parity) for parity in (0, 1)]
+        self.h_neighbours = [self.mask_from_cells((x, y + d) for d in (-1, 1) if 0 <= y + d < squares)
+                             for x, y in map(self.cell, range(self.cells))]
+        self.v_neighbours = [self.mask_from_cells((x + d, y) for d in (-1, 1) if 0 <= x + d < squares)
+                             for x, y in map(self.cell, range(self.cells))]
+        self.placements = {}
+        self.placement_index = {}
+        self.symmetry_tables = None
+        self.windows = {}
+        self.bounds = {}
+        for difficulty in DIFFICULTIES:
+            self.build_windows(scan_radius(difficulty))
+        rng = random.Random(ZOBRIST_SEED + squares)
+        self.zobrist_ship, self.zobrist_attack, self.zobrist_hit = (
+            [rng.getrandbits(ZOBRIST_BITS) for _ in range(self.cells)] for _ in range(3))
+
+    def index(self, x, y):
+        return x * self.squares + y
+
+    def cell(self, index):
+        return divmod(index, self.squares)
+
+    def cell_mask(self, x, y):
+        return self.cell_masks[x * self.squares + y]
+
+    def mask_from_cells(self, cells):
+        mask = 0
+        for x, y in cells:
+            mask |= self.cell_masks[x * self.squares + y]
+        return mask
+
+    def iter_cells(self, mask):
+        while mask:
+            low = mask & -mask
+            yield divmod(low.bit_length() - 1, self.squares)
+            mask ^= low
+
+    def first_cell(self, mask):
+        if not mask:
+            return None
+        return divmod((mask & -mask).bit_length() - 1, self.squares)
+
+    def get_placements(self, size:int):
+        # every (x, y, orientation, mask) of a ship; size 1 ships have a single orientation
+        if size not in self.placements:
+            placements = []
+            orientations = (Ship.HORIZONTAL,) if size == 1 else (Ship.HORIZONTAL, Ship.VERTICAL)
+            for orientation in orientations:
+                for x in range(self.squares):
+                    for y in range(self.squares):
+                        mask = self.placement_mask(x, y, size, orientation)
+                        if mask is not None:
+                            placements.append((x, y, orientation, mask))
+            self.placements[size] = placements
+        return self.placements[size]
+
+    def placement_mask(self, x, y, size, orientation):
+        # mask of a ship with the reference cell (x, y) or None if it leaves the terrain
+        key = (x, y, size, orientation)
+        if key not in self.placement_index:
+            last_x, last_y = (x, y + size - 1) if orientation == Ship.HORIZONTAL else (x + size - 1, y)
+            if x < 0 or y < 0 or last_x >= self.squares or last_y >= self.squares:
+                self.placement_index[key] = None
+            else:
+                step = 1 if orientation == Ship.HORIZONTAL else self.squares
+                start = self.index(x, y)
+                self.placement_index[key] = sum(1 << (start + i * step) for i in range(size))
+        return self.placement_index[key]
+
+    def window_mask(self, x, y, radius:int):
+        # square window of the given radius centered in (x, y), clipped to the terrain
+        if radius not in self.windows:
+            self.build_windows(radius)
+        return self.windows[radius][self.index(x, y)]
+
+    def window_bounds(self, x, y, radius:int):
+        # (x0, y0, x1, y1) corners of the same window, both ends included
+        if radius not in self.bounds:
+            self.build_windows(radius)
+        return self.bounds[radius][self.index(x, y)]
+
+    def scan_window(self, x, y, difficulty:int):
+        return self.window_mask(x, y, scan_radius(difficulty))
+
+    def frontier(self, x, y, difficulty:int):
+        return self.window_bounds(x, y, scan_radius(difficulty))
+
+    def build_windows(self, radius:int):
+        windows = []
+        bounds = []
+        for index in range(self.cells):
+            cx, cy = self.cell(index)
+            x0, x1 = max(cx - radius, 0), min(cx + radius, self.squares - 1)
+            y0, y1 = max(cy - radius, 0), min(cy + radius, self.squares - 1)
+            rows = 0
+            for i in range(x0, x1 + 1):
+                rows |= self.row_masks[i]
+            cols = 0
+            for j in range(y0, y1 + 1):
+                cols |= self.col_masks[j]
+            windows.append(rows & cols)
+            bounds.append((x0, y0, x1, y1))
+        self.windows[radius] = windows
+        self.bounds[radius] = bounds
+
+    def transform_cell(self, x, y, symmetry:int):
+        return SYMMETRIES[symmetry](x, y, self.squares - 1)
+
+    def inverse_symmetry(self, symmetry:int):
+        probes = ((0, 1), (1, 0))
+        for inverse in range(len(SYMMETRIES)):
+            if all(self.transform_cell(*self.transform_cell(x, y, symmetry), inverse) == (x, y) for x, y in probes):
+                return inverse
+
+    def transform_mask(self, mask, symmetry:int):
+        # one table lookup per row: tables[symmetry][row][bits of the row] -> transformed mask
+        if self.symmetry_tables is None:
+            self.build_symmetry_tables()
+        tables = self.symmetry_tables[symmetry]
+        row_mask = (1 << self.squares) - 1
+        result = 0
+        for x in range(self.squares):
+            bits = (mask >> (x * self.squares)) & row_mask
+            if bits:
+                result |= tables[x][bits]
+        return result
+
+    def build_symmetry_tables(self):
+        # built aside and published at once, the geometry is shared by the server threads
+        symmetry_tables = []
+        for symmetry in range(len(SYMMETRIES)):
+            rows = []
+            for x in range(self.squares):
+                table = [0] * (1 << self.squares)
+                for bits in range(1, 1 << self.squares):
+                    low = bits & -bits
+                    table[bits] = table[bits ^ low] | self.cell_mask(*self.transform_cell(x, low.bit_length() - 1, symmetry))
+                rows.append(table)
+            symmetry_tables.append(rows)
+        self.symmetry_tables = symmetry_tables
+
+    def zobrist(self, mask, keys):
+        # XOR of the keys of every cell in the mask
+        value = 0
+        while mask:
+            low = mask & -mask
+            value ^= keys[low.bit_length() - 1]
+            mask ^= low
+        return value
+
+    def mask_from_matrix(self, matrix, states):
+        mask = 0
+        for x, row in enumerate(matrix):
+            for y, value in enumerate(row):
+                if value in states:
+                    mask |= self.cell_masks[x * self.squares + y]
+        return mask
+
+
+@lru_cache(maxsize=None)
+def get_geometry(squares:int=10):
+    return BoardGeometry(squares)
+
+def scan_radius(difficulty:int):
+    # same area the system uses for its frontier: 3 cells on level 1, 1 cell on level 3
+    return 4 - difficulty
+
+
+"""
+    Bitboard
+    > state of one terrain kept as two masks: cells with ships and attacked cells
+    > every ship keeps its own mask, so sunk checks are a single AND
+    > placement, bomb, line attack and scan are bitwise operations over precomputed masks
+    > two Zobrist hashes follow every change, XOR-ing only the keys of the cells that changed:
+      hash - ships and attacked cells, the identity of the whole terrain
+      visible_hash - attacked cells and hits, what the attacker knows about the terrain
+    > the hashes don't depend on the ship ids
+
+"""
+class Bitboard:
+    def __init__(self, squares:int=10):
+        self.geometry = get_geometry(squares)
+        self.ships = 0
+        self.attacked = 0
+        self.ship_masks = {}
+        self.hash = 0
+        self.visible_hash = 0
+
+    @property
+    def hits(self):
+        return self.ships & self.attacked
+
+    @property
+    def misses(self):
+        return self.attacked & ~self.ships
+
+    def can_place(self, mask):
+        return mask is not None and not self.ships & mask
+
+    def place_ship(self, ship_id, mask):
+        geometry = self.geometry
+        self.hash ^= geometry.zobrist(mask, geometry.zobrist_ship)
+        self.visible_hash ^= geometry.zobrist(mask & self.attacked, geometry.zobrist_hit)
+        self.ships |= mask
+        self.ship_masks[ship_id] = mask
+
+    def place(self, x, y, size, orientation, ship_id):
+        mask = self.geometry.placement_mask(x, y, size, orientation)
+        if not self.can_place(mask):
+            return False
+        self.place_ship(ship_id, mask)
+        return True
+
+    def bomb(self, x, y):
+        index = self.geometry.index(x, y)
+        mask = self.geometry.cell_masks[index]
+        hit = bool(self.ships & mask)
+        if not self.attacked & mask:
+            key = self.geometry.zobrist_attack[index]
+            self.hash ^= key
+            self.visible_hash ^= (key ^ self.geometry.zobrist_hit[index]) if hit else key
+            self.attacked |= mask
+        return hit
+
+    def line_attack(self, x):
+        # new hits made by attacking the whole row x
+        row = self.geometry.row_masks[x]
+        new_hits = row & self.ships & ~self.attacked
+        self.set_attacked(self.attacked | row)
+        return new_hits
+
+    def set_attacked(self, attacked):
+        # replace the attacked cells, the hashes only change for the cells that differ
+        geometry = self.geometry
+        changed = attacked ^ self.attacked
+        keys = geometry.zobrist(changed, geometry.zobrist_attack)
+        self.hash ^= keys
+        self.visible_hash ^= keys ^ geometry.zobrist(changed & self.ships, geometry.zobrist_hit)
+        self.attacked = attacked
+
+    def scan(self, x, y, radius:int=1):
+        # unattacked ship cells inside the scanned window
+        return self.geometry.window_mask(x, y, radius) & self.ships & ~self.attacked
+
+    def ship_at(self, x, y):
+        mask = self.geometry.cell_mask(x, y)
+        for ship_id, ship_mask in self.ship_masks.items():
+            if ship_mask & mask:
+                return ship_id
+        return 0
+
+    def sunk_mask(self):
+        # cells of the sunk ships, the only ship positions an attacker gets to know
+        mask = 0
+        for ship_mask in self.ship_masks.values():
+            if ship_mask & self.attacked == ship_mask:
+                mask |= ship_mask
+        return mask
+
+    def is_sunk(self, ship_id):
+        mask = self.ship_masks[ship_id]
+        return mask & self.attacked == mask
+
+    def all_sunk(self):
+        return self.ships & ~self.attacked == 0
+
+    def state_at(self, x, y):
+        mask = self.geometry.cell_mask(x, y)
+        if self.ships & mask:
+            return MapState.SHIP_ATTACKED.value if self.attacked & mask else MapState.SHIP_PLACED.value
+        return MapState.SPACE_ATTACKED.value if self.attacked & mask else MapState.SPACE_FREE.value
+
+    def to_matrix(self):
+        squares = self.geometry.squares
+        matrix_state = [[self.state_at(x, y) for y in range(squares)] for x in range(squares)]
+        matrix_ids = [[0] * squares for _ in range(squares)]
+        for ship_id, mask in self.ship_masks.items():
+            for x, y in self.geometry.iter_cells(mask):
+                matrix_ids[x][y] = ship_id
+        return {"state": matrix_state, "ids": matrix_ids}
+
+    def compute_hashes(self):
+        # (hash, visible_hash) from scratch, the incremental ones must always match these
+        geometry = self.geometry
+        attacked = geometry.zobrist(self.attacked, geometry.zobrist_attack)
+        return (geometry.zobrist(self.ships, geometry.zobrist_ship) ^ attacked,
+                attacked ^ geometry.zobrist(self.hits, geometry.zobrist_hit))
+
+    @classmethod
+    def from_matrix(cls, matrix:dict):
+        board = cls(len(matrix["state"]))
+        geometry = board.geometry
+        board.attacked = geometry.mask_from_matrix(matrix["state"], (MapState.SPACE_ATTACKED.value, MapState.SHIP_ATTACKED.value))
+        for x, row in enumerate(matrix["ids"]):
+            for y, ship_id in enumerate(row):
+                if ship_id:
+                    ship_id = int(ship_id)
+                    board.ship_masks[ship_id] = board.ship_masks.get(ship_id, 0) | geometry.cell_mask(x, y)
+        for mask in board.ship_masks.values():
+            board.ships |= mask
+        board.hash, board.visible_hash = board.compute_hashes()
+        return board
+
+    def to_state(self):
+        # the masks alone, JSON friendly; the hashes are computed again by from_state
+        return {"squares": self.geometry.squares, "attacked": self.attacked,
+                "ships": [[ship_id, mask] for ship_id, mask in self.ship_masks.items()]}
+
+    @classmethod
+    def from_state(cls, state:dict):
+        board = cls(int(state["squares"]))
+        board.attacked = int(state["attacked"])
+        for ship_id, mask in state["ships"]:
+            board.ship_masks[int(ship_id)] = int(mask)
+            board.ships |= int(mask)
+        board.hash, board.visible_hash = board.compute_hashes()
+        return board
+
+    def copy(self):
+        board = Bitboard.__new__(Bitboard)
+        board.geometry = self.geometry
+        board.ships = self.ships
+        board.attacked = self.attacked
+        board.ship_masks = dict(self.ship_masks)
+        board.hash = self.hash
+        board.visible_hash = self.visible_hash
+        return board
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 24 15:47:09 2026
+
+@authors: Catalin.BUTACU, Serban.VICOL, Nicu.TARADACIUC
+"""
+
+# LIBS
+import asyncio
+import itertools
+import json
+import random
+import time
+
+from game_server import HOST, PORT, GameServer
+
+# GLOBALS
+SQUARES = 10
+
+
+class ServerError(Exception):
+    pass
+
+
+"""
+    GameClient - ASYNCIO
+    > one connection to a GameServer, a request waits for its own answer
+    > the server errors come back as ServerError
+
+"""
+class GameClient:
+    def __init__(self, host:str=HOST, port:int=PORT):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+        self.request_ids = itertools.count(1)
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        return self
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            await self.writer.wait_closed()
+            self.writer = None
+
+    async def request(self, cmd:str, **kwargs):
+        request_id = next(self.request_ids)
+        self.writer.write(json.dumps({"id": request_id, "cmd": cmd, **kwargs}).encode() + b"\n")
+        await self.writer.drain()
+        response = json.loads(await self.reader.readline())
+        if not response.get("ok"):
+            raise ServerError(response.get("error"))
+        return response
+
+    async def create_game(self, difficulty:int=1, seed=None):
+        return (await self.request("create_game", difficulty=difficulty, seed=seed))["game"]
+
+    async def place_fleet(self, game:int, fleet=None):
+        return await self.request("place_fleet", game=game, fleet=fleet)
+
+    async def submit_move(self, game:int, ability:str, row:int, col:int=0):
+        return await self.request("submit_move", game=game, ability=ability, row=row, col=col)
+
+    async def get_board(self, game:int, terrain:str="user"):
+        return (await self.request("get_board", game=game, terrain=terrain))["state"]
+
+    async def close_game(self, game:int):
+        return await self.request("close_game", game=game)
+
+    async def snapshot_game(self, game:int):
+        return (await self.request("snapshot_game", game=game))["snapshot"]
+
+    async def restore_game(self, snapshot:str):
+        return (await self.request("restore_game", snapshot=snapshot))["game"]
+
+
+# SCRIPTED GAMES
+async def play_scripted_game(client:GameClient, difficulty:int=1, seed=None, latencies=None):
+    # random fleet, bombs in a shuffled order until someone wins; returns (winner, player moves)
+    game = await client.create_game(difficulty, seed)
+    await client.place_fleet(game)
+    cells = [(x, y) for x in range(SQUARES) for y in range(SQUARES)]
+    random.Random(seed).shuffle(cells)
+    winner = None
+    moves = 0
+    for x, y in cells:
+        start = time.perf_counter()
+        response = await client.submit_move(game, "B", x, y)
+        if latencies is not None:
+            latencies.append(time.perf_counter() - start)
+        moves += 1
+        winner = response["winner"]
+        if winner:
+            break
+    await client.close_game(game)
+    return winner, moves
+
+async def run_load(games:int, difficulty:int=1, host:str=HOST, port:int=PORT):
+    # games played at the same time, one connection each
+    latencies = []
+
+    async def one_game(seed):
+        client = await GameClient(host, port).connect()
+        try:
+            return await play_scripted_game(client, difficulty, seed, latencies)
+        finally:
+            await client.close()
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one_game(seed) for seed in range(games)))
+    elapsed = time.perf_counter() - start
+    return results, latencies, elapsed
+
+async def run_local_load(games:int, difficulty:int=1):
+    # same load against a server started in this process, on a free port
+    server = GameServer(port=0)
+    await server.start()
+    try:
+        return await run_load(games, difficulty, server.host, server.port)
+    finally:
+        await server.close()
+
+
+# LOCAL MAIN
+if __name__ == "__main__":
+    import sys
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    difficulty = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    port = int(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    if port is None:
+        results, latencies, elapsed = asyncio.run(run_local_load(games, difficulty))
+    else:
+        results, latencies, elapsed = asyncio.run(run_load(games, difficulty, HOST, port))
+    wins = sum(winner == "JUCATOR" for winner, _ in results)
+    print(f"{games} games on level {difficulty} in {elapsed:.2f}s, player won {wins}")
+    print(f"{len(latencies) / elapsed:.1f} moves/s, mean latency {1000 * sum(latencies) / len(latencies):.2f} ms")
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Nov  4 09:21:53 2026
+
+@authors: Catalin.BUTACU, Serban.VICOL, Nicu.TARADACIUC
+"""
+
+# LIBS
+import os
+import re
+import struct
+import time
+
+import numpy as np
+
+from game_bitboard import Bitboard
+from UI.DataCollector import MapState
+
+# GLOBALS
+CORPUS_FILE = "boards.bin"
+CORPUS_MAGIC = b"BSBC"
+CORPUS_VERSION = 1
+
+# header: magic, version, squares, record size, number of boards; the records start at DATA_OFFSET
+HEADER = struct.Struct("<4sHHIQ")
+DATA_OFFSET = 32
+
+# a record is one byte per cell, row by row: ship id << 2 | MapState value
+STATE_BITS = 2
+STATE_MASK = (1 << STATE_BITS) - 1
+MAX_SHIP_ID = (1 << (8 - STATE_BITS)) - 1
+
+# the tokens of map_start.txt / map_parcurs.txt
+FREE_TOKEN = "liber"
+ATTACKED_TOKEN = "atacata"
+SHIP_TOKEN = re.compile(r"N(\d+)(_a)?$")
+
+
+# RECORDS
+def encode_matrix(matrix:dict):
+    # the "state"/"ids" matrices of a terrain as one record
+    states = np.asarray(matrix["state"], np.uint8).ravel()
+    ids = np.asarray(matrix["ids"], np.int64).ravel()
+    if ids.max(initial=0) > MAX_SHIP_ID or states.max(initial=0) > STATE_MASK:
+        raise ValueError(f"Ship ids above {MAX_SHIP_ID} or unknown states don't fit in a corpus record")
+    return (ids.astype(np.uint8) << STATE_BITS) | states
+
+def record_states(records):
+    # MapState values of records or of a slice of them, same shape
+    return records & STATE_MASK
+
+def record_ids(records):
+    return records >> STATE_BITS
+
+def decode_record(record, squares:int=10):
+    # back to the matrices TerrainWidget keeps in data
+    return {"state": record_states(record).reshape(squares, squares).tolist(),
+            "ids": record_ids(record).reshape(squares, squares).tolist()}
+
+def record_from_board(board):
+    return encode_matrix(board.to_matrix())
+
+def board_from_record(record, squares:int=10):
+    return Bitboard.from_matrix(decode_record(record, squares))
+
+
+# LEGACY TEXT MAPS
+def parse_token(token:str):
+    # (state, ship id) of one cell of a text map; N<id>_a is a ship cell hit, a bare number too (old maps)
+    if token == FREE_TOKEN:
+        return MapState.SPACE_FREE.value, 0
+    if token == ATTACKED_TOKEN:
+        return MapState.SPACE_ATTACKED.value, 0
+    match = SHIP_TOKEN.match(token)
+    if match:
+        return (MapState.SHIP_ATTACKED.value if match.group(2) else MapState.SHIP_PLACED.value), int(match.group(1))
+    if token.isdigit():
+        return MapState.SHIP_ATTACKED.value, int(token)
+    raise ValueError(f"Unknown map token {token!r}")
+
+def matrix_from_text(text:str):
+    # the matrices of a map file; every row must have as many cells as there are rows
+    rows = [line.split() for line in text.splitlines() if line.strip()]
+    matrix_state, matrix_ids = [], []
+    for x, tokens in enumerate(rows):
+        if len(tokens) != len(rows):
+            raise ValueError(f"Row {x + 1} has {len(tokens)} cells, the map has {len(rows)} rows")
+        cells = []
+        for y, token in enumerate(tokens):
+            try:
+                cells.append(parse_token(token))
+            except ValueError as e:
+                raise ValueError(f"{e} at row {x + 1}, column {y + 1}") from None
+        matrix_state.append([state for state, _ in cells])
+        matrix_ids.append([ship_id for _, ship_id in cells])
+    return {"state": matrix_state, "ids": matrix_ids}
+
+def text_from_record(record, squares:int=10):
+    # a record written the way write_matrix_to_file / Rule_Writing_In_Map do
+    tokens = {MapState.SPACE_FREE.value: lambda ship_id: FREE_TOKEN,
+              MapState.SPACE_ATTACKED.value: lambda ship_id: ATTACKED_TOKEN,
+              MapState.SHIP_PLACED.value: lambda ship_id: f"N{ship_id}",
+              MapState.SHIP_ATTACKED.value: lambda ship_id: f"N{ship_id}_a"}
+    states, ids = record_states(record).tolist(), record_ids(record).tolist()
+    return ''.join(' '.join(tokens[states[i]](ids[i]) for i in range(x * squares, (x + 1) * squares)) + '\n'
+                   for x in range(squares))
+
+
+"""
+    CorpusWriter - WRITER
+    > appends boards as fixed size records after a 32 bytes header, the count is written on close
+    > takes matrices, Bitboards or records already encoded, one at a time or a whole array
+
+"""
+class CorpusWriter:
+    def __init__(self, filename:str=CORPUS_FILE, squares:int=10):
+        self.filename = filename
+        self.squares = squares
+        self.record_size = squares * squares
+        self.count = 0
+        self.file = open(filename, 'wb')
+        self.write_header()
+
+    def write_header(self):
+        self.file.seek(0)
+        self.file.write(HEADER.pack(CORPUS_MAGIC, CORPUS_VERSION, self.squares, self.record_size, self.count).ljust(DATA_OFFSET, b"\0"))
+
+    def append(self, board):
+        if isinstance(board, Bitboard):
+            board = record_from_board(board)
+        elif isinstance(board, dict):
+            board = encode_matrix(board)
+        self.extend(np.asarray(board, np.uint8).reshape(1, -1))
+
+    def extend(self, records):
+        records = np.ascontiguousarray(records, np.uint8)
+        if records.ndim != 2 or records.shape[1] != self.record_size:
+            raise ValueError(f"Records of {self.record_size} cells expected, got shape {records.shape}")
+        self.file.write(records.tobytes())
+        self.count += len(records)
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.write_header()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+"""
+    BoardCorpus - READER
+    > the records of a corpus file as a read-only numpy.memmap of (boards, cells) bytes
+    > corpus[a:b] is a view of the file, nothing is read before the cells are used;
+      record_states / record_ids decode any slice at once
+
+"""
+class BoardCorpus:
+    def __init__(self, filename:str=CORPUS_FILE):
+        with open(filename, 'rb') as file:
+            header = file.read(DATA_OFFSET)
+        if len(header) < HEADER.size:
+            raise ValueError(f"{filename} is not a board corpus")
+        magic, version, squares, record_size, count = HEADER.unpack_from(header)
+        if magic != CORPUS_MAGIC or record_size != squares * squares:
+            raise ValueError(f"{filename} is not a board corpus")
+        if version != CORPUS_VERSION:
+            raise ValueError(f"Board corpus version {version} not supported")
+        if os.path.getsize(filename) < DATA_OFFSET + count * record_size:
+            raise ValueError(f"{filename} is truncated, {count} boards expected")
+        self.filename = filename
+        self.squares = squares
+        self.count = count
+        if count:
+            self.records = np.memmap(filename, np.uint8, 'r', DATA_OFFSET, (count, record_size))
+        else:
+            self.records = np.zeros((0, record_size), np.uint8)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        return self.records[i]
+
+    def matrix(self, i:int):
+        return decode_record(self.records[i], self.squares)
+
+    def board(self, i:int):
+        return board_from_record(self.records[i], self.squares)
+
+    def boards(self, start:int=0, stop=None):
+        for i in range(start, self.count if stop is None else min(stop, self.count)):
+            yield self.board(i)
+
+
+# CONVERTERS
+def convert_text_maps(filenames, corpus_file:str=CORPUS_FILE):
+    # legacy map files into one corpus, in the given order; every map must have the same size
+    squares = None
+    writer = None
+    try:
+        for filename in filenames:
+            with open(filename, 'r') as file:
+                matrix = matrix_from_text(file.read())
+            if squares is None:
+                squares = len(matrix["state"])
+                writer = CorpusWriter(corpus_file, squares)
+            elif len(matrix["state"]) != squares:
+                raise ValueError(f"{filename} is {len(matrix['state'])}x{len(matrix['state'])}, the corpus is {squares}x{squares}")
+            writer.append(matrix)
+    finally:
+        if writer is not None:
+            writer.close()
+    return writer.count if writer is not None else 0
+
+def export_text_map(corpus:BoardCorpus, i:int, filename:str):
+    # one board back to a map file, for the rules that still read map_start.txt
+    with open(filename, 'w') as file:
+        file.write(text_from_record(corpus[i], corpus.squares))
+
+
+# ENGINE
+def engine_turns(corpus:BoardCorpus, difficulty:int=2, start:int=0, stop=None, file_name:str="main.clp", seed=None):
+    # (board index, first attack of the system) for every board of the slice, the boards are asserted
+    # straight into one reused EngineSession, without map files
+    from game_engine import EngineSession
+    session = EngineSession(file_name)
+    for i in range(start, len(corpus) if stop is None else min(stop, len(corpus))):
+        if seed is not None:
+            session.seed(seed)
+        session.init(corpus.board(i), difficulty)
+        yield i, session.system_turn()
+
+
+# LOCAL MAIN
+if __name__ == "__main__":
+    import sys
+    command = sys.argv[1] if len(sys.argv) > 1 else "info"
+    start = time.perf_counter()
+    if command == "convert":
+        corpus_file = sys.argv[2] if len(sys.argv) > 2 else CORPUS_FILE
+        filenames = sys.argv[3:] or ["map_start.txt"]
+        count = convert_text_maps(filenames, corpus_file)
+        print(f"{count} boards in {corpus_file}, {time.perf_counter() - start:.2f}s")
+    elif command == "info":
+        corpus = BoardCorpus(sys.argv[2] if len(sys.argv) > 2 else CORPUS_FILE)
+        print(f"{len(corpus)} boards of {corpus.squares}x{corpus.squares}, version {CORPUS_VERSION}")
+        if len(sys.argv) > 3:
+            print(text_from_record(corpus[int(sys.argv[3])], corpus.squares), end="")
+    elif command == "export":
+        corpus = BoardCorpus(sys.argv[2] if len(sys.argv) > 2 else CORPUS_FILE)
+        index = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+        export_text_map(corpus, index, sys.argv[4] if len(sys.argv) > 4 else "map_start.txt")
+    elif command == "engine":
+        corpus = BoardCorpus(sys.argv[2] if len(sys.argv) > 2 else CORPUS_FILE)
+        difficulty = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+        stop = int(sys.argv[4]) if len(sys.argv) > 4 else None
+        turns = sum(1 for _ in engine_turns(corpus, difficulty, stop=stop, seed=0))
+        elapsed = time.perf_counter() - start
+        print(f"{turns} boards through the rule base on level {difficulty}, {turns / elapsed:.1f} boards/s")
+    else:
+        raise SystemExit(f"Unknown command {command}, use convert, info, export or engine")
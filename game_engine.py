@@ -6,47 +6,107 @@ Created on Fri Apr 19 10:25:34 2024
 """
 
 # LIBS
-import clips
+import os
+import sys
+import tempfile
+import time
+import weakref
+from collections import Counter
+from functools import lru_cache
+
+from game_bitboard import Bitboard, get_geometry, scan_radius, DIFFICULTIES, ZOBRIST_BITS
 
 # GLOBALS
-env = clips.Environment()
+env = None # environment of the UI, created by get_env on first use
 SISTEM_ASTEAPTA = 0
 SISTEM_DECIDE = 1
+RUN_LIMIT = 5000 # max rules fired by the system in one turn
+TURN_DEADLINE = 0.2 # seconds of inference in one turn of the UI, the turn is halted past it
+RUN_SLICE = 100 # rules fired between two checks of the deadline and of the agenda
+LIVELOCK_SLICES = 4 # slices in a row ending on the same agenda and number of facts: the rules loop without progress
+SESSIONS = weakref.WeakSet() # every EngineSession alive, each one owns a CLIPS environment
+SCAN_RADIUS = 1 # window of the Atac_scanare rules
+# facts only the map file rules use, a session without map files retracts them
+FILE_BOOKKEEPING = ("harta", "global_var", "update_map", "update_map_now")
+
+# why a bounded run stopped before the agenda emptied
+HALT_LIMIT = "limit"
+HALT_DEADLINE = "deadline"
+HALT_LIVELOCK = "livelock"
+HALT_FILES = "files"
 
 
 # INITS
+def get_env():
+    # clipspy is imported here, a headless import of game_engine doesn't pay for it
+    global env
+    if env is None:
+        import clips
+        env = clips.Environment()
+    return env
+
 def init_sistem_env(file_name:str="main.clp"):
+    env = get_env()
     env.clear()
     env.load(file_name)
     env.reset()
+    assert_lookup_tables()
     #env.run()
 
+def assert_lookup_tables(squares:int=10):
+    get_env().eval(lookup_table_facts(squares))
+
+@lru_cache(maxsize=None)
+def lookup_table_facts(squares:int=10, difficulties=DIFFICULTIES):
+    # scan windows, frontiers and terrain columns for the given difficulties, 1-based like the Teren facts
+    geometry = get_geometry(squares)
+    facts = [f"(raza_frontiera {difficulty} {scan_radius(difficulty)})" for difficulty in difficulties]
+    for radius in sorted({scan_radius(difficulty) for difficulty in difficulties} | {SCAN_RADIUS}):
+        for x in range(squares):
+            for y in range(squares):
+                x0, y0, x1, y1 = geometry.window_bounds(x, y, radius)
+                facts.append(f"(fereastra {radius} {x + 1} {y + 1} {x0 + 1} {y0 + 1} {x1 + 1} {y1 + 1})")
+    facts.append("(coloane_teren " + ' '.join(str(y + 1) for y in range(squares)) + ")")
+    return "(assert " + ' '.join(facts) + ")"
+
 
 # EXECUTERS
 def execute_freeze_state_sistem():
-    env.eval("(assert (freeze_state_sistem))")
-    print_all_agenda()
-    env.run(1)
+    get_env().eval("(assert (freeze_state_sistem))")
+    get_env().run(1)
 
 def execute_update_map():
-    env.eval("(assert (update_map_now))")
-    print_all_agenda()
-    env.run(1)
+    get_env().eval("(assert (update_map_now))")
+    get_env().run(1)
 
-def execute_update_file_map_using_matrix(matrix:dict):
+def execute_update_file_map_using_matrix(matrix:dict, board=None, load_terrain:bool=False):
+    # (rules fired, None) or (rules fired, HALT_...) when the turn was halted and the system didn't finish it;
+    # board: the Bitboard of the matrix when the caller keeps one, its hashes are already up to date;
+    # load_terrain: the first run, the rules read the terrain from map_start.txt and the ships come from the board,
+    # nothing is loaded when the turn can't start
     filename = "map_parcurs.txt"
     try:
         write_matrix_to_file(filename, matrix)
     except Exception as e:
         print("File in use for WRITE event... :<")
         print(e)
-        return
+        return 0, HALT_FILES
 
+    board = board or Bitboard.from_matrix(matrix)
+    if load_terrain:
+        write_matrix_to_file("map_start.txt", matrix)
+        execute_assert_fleet(board)
+    get_env().eval(zobrist_facts(board))
+    get_env().eval("(bind ?*rand_atac_linie* 0)")
     set_state_of_sistem(1)
     execute_update_map()
-
-    print_all_agenda()
-    env.run()
+    fired, halted = run_bounded(get_env())
+    if halted:
+        # the map file still gets the attacks played before the halt
+        halt_turn(get_env())
+        get_env().eval("(assert (update_map_now))")
+        fired += run_bounded(get_env())[0]
+    return fired, halted
 
 def execute_update_matrix_using_file_map():
     filename = "map_parcurs.txt"
@@ -59,9 +119,92 @@ def execute_update_matrix_using_file_map():
          return
 
 
+def execute_read_line_attack():
+    # 0-based row of the line attack of the last system turn, None when the turn had none
+    line = get_env().eval("?*rand_atac_linie*")
+    return line - 1 if line else None
+
+def execute_external_attacks(board, cells):
+    # the cells attacked without the rules (fallback, opening book) once the terrain was read, cells: a mask
+    if cells:
+        get_env().eval("(progn " + ' '.join(f"(atac_extern T1 {x + 1} {y + 1})" for x, y in board.geometry.iter_cells(cells)) + ")")
+
+def execute_snapshot():
+    # the rule base of the UI game between two turns, the map files are closed then
+    return snapshot_env(get_env())
+
+def execute_restore(state:dict, file_name:str="main.clp"):
+    # into the module environment, fresh or still running another game
+    init_sistem_env(file_name)
+    restore_env(get_env(), state)
+
+def execute_assert_fleet(board):
+    # the fleet placed by the player, before the first run reads the terrain from map_start.txt
+    get_env().eval(ship_facts(board))
+
+def execute_set_difficulty(difficulty:int):
+    get_env().eval(difficulty_facts(difficulty))
+
+def execute_seed(seed:int):
+    # the (random ...) calls of the rules repeat for the same seed
+    get_env().eval(f"(seed {int(seed)})")
+
+
+# BOUNDED RUNS
+def agenda_signature(env):
+    return tuple(activation.name for activation in env.activations()), env.eval("(length$ (get-fact-list))")
+
+def run_slice(env, size:int, trace=None):
+    # env.run(size); with a trace list the rules fire one by one and every activation fired is appended to it
+    if trace is None:
+        return env.run(size)
+    fired = 0
+    while fired < size:
+        activation = next(iter(env.activations()), None)
+        if activation is None:
+            break
+        trace.append(str(activation))
+        if not env.run(1):
+            break
+        fired += 1
+    return fired
+
+def run_bounded(env, limit:int=RUN_LIMIT, deadline:float=TURN_DEADLINE, slice_size:int=RUN_SLICE, trace=None):
+    # env.run in slices: (rules fired, None) when the agenda emptied, (rules fired, HALT_...) when stopped before;
+    # a loop like Stergere_atacuri_nefolosite_sistem re-rolling attacked cells keeps the same agenda and facts;
+    # deadline None: no wall clock, the run stops the same way on every machine
+    stop = None if deadline is None else time.perf_counter() + deadline
+    fired = 0
+    signature = None
+    repeats = 0
+    while fired < limit:
+        size = min(slice_size, limit - fired)
+        step = run_slice(env, size, trace)
+        fired += step
+        current = agenda_signature(env)
+        if not current[0] or not step:
+            return fired, None
+        repeats = repeats + 1 if current == signature else 0
+        signature = current
+        if repeats >= LIVELOCK_SLICES - 1:
+            return fired, HALT_LIVELOCK
+        if stop is not None and time.perf_counter() > stop:
+            return fired, HALT_DEADLINE
+    return fired, HALT_LIMIT
+
+def halt_turn(env):
+    # drop what the rules still planned (activations, attacks not played) and give the turn back to the player
+    env.eval("(progn (do-for-all-facts ((?f Sistem)) TRUE (retract ?f)) (assert (Sistem asteapta)))")
+    for activation in list(env.activations()):
+        activation.delete()
+
+
 # GETTERS
+def get_live_sessions():
+    return list(SESSIONS)
+
 def get_clips_state():
-    for fact in env.facts():
+    for fact in get_env().facts():
         if "(Sistem asteapta)" in str(fact):
             return True
     return False
@@ -75,56 +218,37 @@ def set_state_of_sistem(decisional_state:int = 0): # 0 - Sistem asteapta, 1 - Si
     new_state = "asteapta" if decisional_state == 0 else "decide"
     fact_to_add = f"(assert (Sistem {new_state}))"
     execute_freeze_state_sistem()
-    env.eval(fact_to_add)
+    get_env().eval(fact_to_add)
 
 
 # DISPLAY
+def print_memory_report(report:dict):
+    print(f"CLIPS: {report['mem_used'] / 1024:.0f} KiB, {report['facts']} facts, {report['partial_matches']} partial matches")
+    for relation, count in report["facts_by_relation"].most_common():
+        print(f"    {relation:<24} {count}")
+    print(f"Python: {report['python_bytes'] / 1024:.1f} KiB per session, {report['shared_bytes'] / 1024:.0f} KiB shared lookup tables")
+
 def print_all_facts():
     print('######### Afisarea bazei de fapte #########')
-    for fact in env.facts():
+    for fact in get_env().facts():
         print(fact)
 
 def print_all_agenda():
     print("\n### AGENDA's ACTIVATIONS")
-    for activation in env.activations():
+    for activation in get_env().activations():
         print(activation)
 
 # READ / WRITE MAP
 def read_and_transform_matrix(filename):
-    matrix_state = []
-    matrix_ids = []
+    # the tokens are checked by game_corpus, an unknown one is reported with its row and column
+    from game_corpus import matrix_from_text
     try:
         with open(filename, 'r') as file:
-            for line in file:
-                row_state = []
-                row_ids = []
-                items = line.strip().split()
-                for item in items:
-                    if item == "liber":
-                        row_state.append(0)
-                        row_ids.append(0)  # Add 0 to IDs matrix when there's no corresponding ID
-                    elif item == "atacata":
-                        row_state.append(1)
-                        row_ids.append(0)  # Add 0 to IDs matrix when there's no corresponding ID
-                    elif item.startswith("N"):
-                        if "_a" in item:
-                            num = int(item[1:-2])
-                            row_state.append(3)  # Set the state matrix value to 3 when encountering "_a"
-                        else:
-                            num = int(item[1:])
-                            row_state.append(2)
-                        row_ids.append(num)
-                    else:
-                        row_state.append(3)
-                        row_ids.append(int(item))
-                matrix_state.append(row_state)
-                matrix_ids.append(row_ids)
+            return matrix_from_text(file.read())
     except Exception as e:
         print(f"An error occurred while reading and transforming the matrix: {e}")
         return None
 
-    return {"state": matrix_state, "ids": matrix_ids}
-
 def write_matrix_to_file(filename, matrix):
     try:
         with open(filename, 'w') as file:
@@ -148,8 +272,264 @@ def write_matrix_to_file(filename, matrix):
         return
 
 
+# FACTS FROM PYTHON
+def difficulty_facts(difficulty:int):
+    return f"(progn (do-for-all-facts ((?f dificultate)) TRUE (retract ?f)) (assert (dificultate {int(difficulty)})))"
+
+def terrain_facts(board, terrain:str="T1"):
+    # the Teren facts of a Bitboard, the same facts Rule_Reading_Map builds from a map file
+    facts = []
+    squares = board.geometry.squares
+    for x in range(squares):
+        for y in range(squares):
+            mask = board.geometry.cell_mask(x, y)
+            state = "atacata" if board.attacked & mask else None
+            if board.ships & mask:
+                facts.append(f"(Teren (teren {terrain}) (rand {x + 1}) (coloana {y + 1}) (stare {state or 'neatacata'}) (nava N{board.ship_at(x, y)}))")
+            else:
+                facts.append(f"(Teren (teren {terrain}) (rand {x + 1}) (coloana {y + 1}) (stare {state or 'liber'}))")
+    return "(assert " + ' '.join(facts) + ")"
+
+def ship_facts(board, terrain:str="T1"):
+    # the Nava facts of the fleet placed on a Bitboard with the counters of nava_lovita, in a single assert
+    geometry = board.geometry
+    facts = []
+    afloat = 0
+    for ship_id, mask in board.ship_masks.items():
+        ship = f"N{ship_id}"
+        cells = [(x + 1, y + 1) for x, y in geometry.iter_cells(mask)]
+        if len({x for x, _ in cells}) == 1:
+            facts.append(f"(Nava orizontala {ship} rand {cells[0][0]} pe coloanele {' '.join(str(y) for _, y in cells)})")
+        else:
+            facts.append(f"(Nava verticala {ship} coloana {cells[0][1]} pe randurile {' '.join(str(x) for x, _ in cells)})")
+        left = bin(mask & ~board.attacked).count("1")
+        afloat += left > 0
+        facts.append(f"(Nava {ship} in terenul {terrain})")
+        facts.append(f"(Nava {ship} are lungimea {len(cells)})")
+        facts.append(f"(Nava {ship} {'nu este' if left else 'este'} distrusa)")
+        facts.append(f"(Nava {ship} din terenul {terrain} are {left} celule neatacate)")
+    facts.append(f"(Flota {terrain} are {afloat} nave nedistruse)")
+    if board.ship_masks and not afloat:
+        facts.append(f"(Flota {terrain} distrusa)")
+    return "(assert " + ' '.join(facts) + ")"
+
+def zobrist_facts(board, terrain:str="T1"):
+    # (zobrist <terrain> <hash> <visible hash>), a single fact per terrain; CLIPS integers are signed
+    def signed(value):
+        return value - (1 << ZOBRIST_BITS) if value >> (ZOBRIST_BITS - 1) else value
+    return (f"(progn (do-for-all-facts ((?f zobrist)) (eq (nth$ 1 ?f:implied) {terrain}) (retract ?f)) "
+            f"(assert (zobrist {terrain} {signed(board.hash)} {signed(board.visible_hash)})))")
+
+def save_facts_text(env):
+    # save-facts through a temporary file, loading the facts back from a file is much faster than from a string
+    handle, path = tempfile.mkstemp(suffix=".clp")
+    os.close(handle)
+    try:
+        env.save_facts(path)
+        with open(path, encoding="utf-8") as file:
+            return file.read()
+    finally:
+        os.remove(path)
+
+def load_facts_text(env, facts:str):
+    handle, path = tempfile.mkstemp(suffix=".clp")
+    try:
+        with os.fdopen(handle, "w", encoding="utf-8") as file:
+            file.write(facts)
+        env.load_facts(path)
+    finally:
+        os.remove(path)
+
+def snapshot_env(env):
+    # what a CLIPS environment adds to its rule base: the save-facts text, defglobals, the rules waiting on the agenda
+    return {
+        "facts": save_facts_text(env),
+        "globals": {variable.name: clips_literal(variable.value) for variable in env.globals()},
+        "agenda": [activation.name for activation in env.activations()],
+    }
+
+def restore_env(env, state:dict):
+    # the facts keep their order, the recency of the facts decides between the rules of the same salience
+    env.reset()
+    env.eval("(retract *)")
+    load_facts_text(env, state["facts"])
+    if state["globals"]:
+        env.eval("(progn " + ' '.join(f"(bind ?*{name}* {value})" for name, value in state["globals"].items()) + ")")
+    # asserting again wakes up rules that already fired on these facts, only the ones waiting before stay
+    waiting = Counter(state["agenda"])
+    for activation in list(env.activations()):
+        if waiting[activation.name]:
+            waiting[activation.name] -= 1
+        else:
+            activation.delete()
+
+def clips_literal(value):
+    # a global value written the way the CLIPS reader takes it back
+    from clips import Symbol
+    if isinstance(value, (list, tuple)):
+        return "(create$ " + ' '.join(clips_literal(item) for item in value) + ")"
+    if isinstance(value, Symbol):
+        return str(value)
+    if isinstance(value, str):
+        return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+    return str(value)
+
+
+"""
+    EngineSession
+    > one CLIPS environment running main.clp for one game, without the map files
+    > the user terrain (T1) is asserted from a Bitboard, the attacks planned by the rules are read back
+      with the pozitii_atacate query and the ?*rand_atac_linie* global
+    > a turn of the system that ends with more than one attack returns them one by one
+    > the Zobrist hashes of T1 are kept in a (zobrist T1 ...) fact, refreshed after every turn
+    > only the facts the session needs: the map file bookkeeping is retracted,
+      the scan windows are asserted for the scan radius and the frontier of the current difficulty
+    > memory_report() tells what the session costs: CLIPS memory, facts, partial matches, Python side
+    > the terrain is kept in Teren template facts with integer slots, 5 fields a cell instead of 8 or 12:
+      the 100 facts take about 42 KB of a 2.2 MB environment, the ordered facts before took about 58 KB
+    > last_run keeps the rules fired and the change in the number of facts of the last turn
+    > trace_rules fires the rules one by one, last_agenda and last_rules then tell how the last turn went
+    > a turn runs in bounded slices (run_bounded): past the firing limit or in a livelock it is halted,
+      the attacks played until then are kept and last_run tells why it stopped
+    > no wall clock deadline by default (deadline None), the decisions of a seeded session don't depend
+      on the speed of the machine; the UI turns keep TURN_DEADLINE
+    > snapshot() / restore() move the whole session between environments: the save-facts text, defglobals,
+      the rules waiting on the agenda, board and pending attacks
+
+"""
+class EngineSession:
+    def __init__(self, file_name:str="main.clp"):
+        import clips
+        self.file_name = file_name
+        self.env = clips.Environment()
+        self.env.load(file_name)
+        self.board = None
+        self.difficulty = None
+        self.pending = []
+        self.last_run = {}
+        self.trace_rules = False
+        self.deadline = None
+        self.last_agenda = []
+        self.last_rules = []
+        SESSIONS.add(self)
+
+    def seed(self, seed:int):
+        self.env.eval(f"(seed {int(seed)})")
+
+    def fact_count(self):
+        return self.env.eval("(length$ (get-fact-list))")
+
+    def memory_used(self):
+        # bytes allocated by the CLIPS environment of the session
+        return self.env.eval("(mem-used)")
+
+    def memory_report(self):
+        facts = Counter(fact.template.name for fact in self.env.facts())
+        partial_matches = sum(sum(rule.matches()) for rule in self.env.rules())
+        board = self.board
+        python_bytes = sys.getsizeof(self.pending) + sum(sys.getsizeof(move) for move in self.pending)
+        if board is not None:
+            python_bytes += sum(sys.getsizeof(value) for value in (board.ships, board.attacked, board.hash, board.visible_hash))
+            python_bytes += sys.getsizeof(board.ship_masks) + sum(sys.getsizeof(mask) for mask in board.ship_masks.values())
+        shared_bytes = sum(sys.getsizeof(facts_text) for facts_text in self.shared_tables())
+        return {
+            "mem_used": self.memory_used(),
+            "facts": sum(facts.values()),
+            "facts_by_relation": facts,
+            "partial_matches": partial_matches,
+            "python_bytes": python_bytes,
+            "shared_bytes": shared_bytes,
+        }
+
+    def shared_tables(self):
+        squares = self.board.geometry.squares if self.board is not None else 10
+        return [lookup_table_facts(squares, (difficulty,)) for difficulty in DIFFICULTIES]
+
+    def clear_bookkeeping(self):
+        self.env.eval("(progn " + ' '.join(f"(do-for-all-facts ((?f {relation})) TRUE (retract ?f))" for relation in FILE_BOOKKEEPING) + ")")
+
+    def init(self, board, difficulty:int):
+        self.env.reset()
+        self.clear_bookkeeping()
+        self.env.eval(lookup_table_facts(board.geometry.squares, (int(difficulty),)))
+        self.env.eval(terrain_facts(board))
+        self.env.eval(ship_facts(board))
+        self.env.eval(difficulty_facts(difficulty))
+        self.env.eval(zobrist_facts(board))
+        self.board = board.copy()
+        self.difficulty = difficulty
+        self.pending = []
+
+    def is_synced(self, board, difficulty:int):
+        if self.board is None or difficulty != self.difficulty:
+            return False
+        planned = 0
+        for ability, x, y in self.pending:
+            planned |= self.board.geometry.row_masks[x] if ability == "AL" else self.board.geometry.cell_mask(x, y)
+        return self.board.ships == board.ships and self.board.attacked == board.attacked | planned
+
+    def snapshot(self):
+        return {
+            **snapshot_env(self.env),
+            "board": self.board.to_state() if self.board is not None else None,
+            "difficulty": self.difficulty,
+            "pending": [list(move) for move in self.pending],
+        }
+
+    def restore(self, state:dict):
+        # into a fresh or reused environment with the same rule base
+        restore_env(self.env, state)
+        self.board = Bitboard.from_state(state["board"]) if state["board"] is not None else None
+        self.difficulty = state["difficulty"]
+        self.pending = [tuple(move) for move in state["pending"]]
+        self.last_run = {}
+
+    def set_state(self, decisional_state:int):
+        new_state = "asteapta" if decisional_state == SISTEM_ASTEAPTA else "decide"
+        self.env.eval("(assert (freeze_state_sistem))")
+        self.env.run(1)
+        self.env.eval(f"(assert (Sistem {new_state}))")
+
+    def system_turn(self):
+        # (ability, x, y) of the next attack of the system, 0-based; None if the rules didn't attack
+        if not self.pending:
+            self.pending = self.run_turn()
+        return self.pending.pop(0) if self.pending else None
+
+    def run_turn(self):
+        self.env.eval("(bind ?*rand_atac_linie* 0)")
+        facts = self.fact_count()
+        self.set_state(SISTEM_DECIDE)
+        trace = None
+        if self.trace_rules:
+            self.last_agenda = [str(activation) for activation in self.env.activations()]
+            self.last_rules = trace = []
+        fired, halted = run_bounded(self.env, deadline=self.deadline, trace=trace)
+        if halted:
+            halt_turn(self.env)
+        self.clear_bookkeeping()
+        self.last_run = {"rules_fired": fired, "facts_delta": self.fact_count() - facts}
+        if halted:
+            self.last_run["halted"] = halted
+
+        geometry = self.board.geometry
+        positions = self.env.eval("(pozitii_atacate T1)")
+        attacked = geometry.mask_from_cells((positions[i] - 1, positions[i + 1] - 1) for i in range(0, len(positions), 2))
+        new_cells = attacked & ~self.board.attacked
+        self.board.set_attacked(attacked)
+        self.env.eval(zobrist_facts(self.board))
+
+        moves = []
+        line = self.env.eval("?*rand_atac_linie*")
+        if line:
+            moves.append(("AL", line - 1, 0))
+            new_cells &= ~geometry.row_masks[line - 1]
+        moves.extend(("B", x, y) for x, y in geometry.iter_cells(new_cells))
+        return moves
+
+
 # LOCAL MAIN
 if __name__ == "__main__":
     init_sistem_env()
     set_state_of_sistem(SISTEM_DECIDE)
-    env.run()
+    get_env().run()
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 29 10:07:45 2026
+
+@authors: Catalin.BUTACU, Serban.VICOL, Nicu.TARADACIUC
+"""
+
+# LIBS
+import gzip
+import json
+import zlib
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from game_bitboard import Bitboard
+from game_placement import FleetGenerator, USER_FLEET
+from game_sampler import REPRODUCIBLE_ATTEMPTS
+from game_seed import derive_seed, FLEET, STRATEGY
+from game_strategy import get_strategy, apply_move, Move, ClipsStrategy, MonteCarloStrategy
+from UI.DataCollector import MapState
+
+# GLOBALS
+GOLDEN_FILE = "golden/clips_level2.jsonl.gz"
+GOLDEN_GAMES = 50
+RULES_FILE = "main.clp"
+
+# free, attacked, ship, ship attacked - the MapState values
+BOARD_CHARS = {
+    MapState.SPACE_FREE.value: ".",
+    MapState.SPACE_ATTACKED.value: "o",
+    MapState.SHIP_PLACED.value: "#",
+    MapState.SHIP_ATTACKED.value: "X",
+}
+
+# first move of a game that differs from the golden trace; agenda and rules only for the rule base
+Divergence = namedtuple("Divergence", "seed turn expected actual board agenda rules")
+
+
+# HELPERS
+def rules_digest(file_name:str=RULES_FILE):
+    with open(file_name, "rb") as file:
+        return f"{zlib.crc32(file.read()):08x}"
+
+def strategy_options(name:str, rules:str=RULES_FILE):
+    # the options that make a strategy replay the same moves for the same seed
+    if name == MonteCarloStrategy.name:
+        return {"attempts": REPRODUCIBLE_ATTEMPTS, "workers": 1}
+    if name == ClipsStrategy.name:
+        return {"file_name": rules}
+    return {}
+
+def fleet_board(game_seed:int):
+    board = Bitboard()
+    generator = FleetGenerator(seed=derive_seed(game_seed, FLEET))
+    for ship_id, (x, y, size, orientation) in enumerate(generator.generate(USER_FLEET), start=1):
+        board.place(x, y, size, orientation, ship_id)
+    return board
+
+def format_board(board):
+    return "\n".join(''.join(BOARD_CHARS[state] for state in row) for row in board.to_matrix()["state"])
+
+
+# RECORD
+def record_game(strategy, difficulty:int, game_seed:int):
+    # every decision of the strategy with its result; the boards are rebuilt from the moves on replay
+    board = fleet_board(game_seed)
+    strategy.seed(derive_seed(game_seed, STRATEGY))
+    strategy.reset()
+    moves = []
+    while not board.all_sunk() and len(moves) < board.geometry.cells:
+        move = strategy.next_move(board, difficulty)
+        moves.append([move.ability, move.row, move.col, apply_move(board, move, difficulty)])
+    return {"seed": game_seed, "moves": moves, "hash": board.hash}
+
+def record(file_name:str=GOLDEN_FILE, name:str=ClipsStrategy.name, difficulty:int=2, games:int=GOLDEN_GAMES,
+           run_seed:int=0, rules:str=RULES_FILE):
+    # gzip JSON lines: a header, then one line per game
+    strategy = get_strategy(difficulty, name, **strategy_options(name, rules))
+    header = {"strategy": name, "difficulty": difficulty, "rules": rules_digest(rules), "run_seed": run_seed, "games": games}
+    try:
+        with gzip.open(file_name, "wt", encoding="utf-8") as file:
+            file.write(json.dumps(header) + "\n")
+            for game in range(games):
+                file.write(json.dumps(record_game(strategy, difficulty, derive_seed(run_seed, str(game)))) + "\n")
+    finally:
+        strategy.close()
+    return header
+
+def load_golden(file_name:str=GOLDEN_FILE):
+    with gzip.open(file_name, "rt", encoding="utf-8") as file:
+        header = json.loads(file.readline())
+        return header, [json.loads(line) for line in file]
+
+
+# REPLAY
+def engine_session(strategy):
+    # the EngineSession behind a strategy, None for the Python ones
+    return getattr(getattr(strategy, "inner", strategy), "session", None)
+
+def replay_game(strategy, difficulty:int, game:dict, trace_rules:bool=False):
+    # (positions checked, first Divergence or None); the golden moves are played, the strategy only decides
+    board = fleet_board(game["seed"])
+    inner = getattr(strategy, "inner", strategy)
+    if isinstance(inner, ClipsStrategy):
+        inner.trace_rules = trace_rules
+    strategy.seed(derive_seed(game["seed"], STRATEGY))
+    strategy.reset()
+    for turn, (ability, row, col, result) in enumerate(game["moves"]):
+        expected = Move(ability, row, col)
+        actual = strategy.next_move(board, difficulty)
+        if actual != expected:
+            session = engine_session(strategy)
+            agenda, rules = (session.last_agenda, session.last_rules) if session is not None and trace_rules else ([], [])
+            return turn, Divergence(game["seed"], turn, expected, actual, format_board(board), agenda, rules)
+        if apply_move(board, expected, difficulty) != result:
+            raise ValueError(f"Game {game['seed']}: move {turn} doesn't give the recorded result, the trace doesn't match the fleets")
+    if board.hash != game["hash"]:
+        raise ValueError(f"Game {game['seed']}: final board differs from the recorded one")
+    return len(game["moves"]), None
+
+def check_games(games, name:str, difficulty:int, rules:str=RULES_FILE):
+    # one strategy for the games; a diverging game is played again with the rules traced, for the report
+    strategy = get_strategy(difficulty, name, **strategy_options(name, rules))
+    positions = 0
+    divergences = []
+    try:
+        for game in games:
+            checked, divergence = replay_game(strategy, difficulty, game)
+            positions += checked
+            if divergence is not None:
+                _, divergence = replay_game(strategy, difficulty, game, trace_rules=True)
+                divergences.append(divergence)
+    finally:
+        strategy.close()
+    return positions, divergences
+
+def check(file_name:str=GOLDEN_FILE, name=None, rules:str=RULES_FILE, workers:int=1):
+    # replay the golden games against a rule base or another strategy, games split between worker processes
+    header, games = load_golden(file_name)
+    name = name or header["strategy"]
+    difficulty = header["difficulty"]
+    if workers > 1:
+        chunks = [games[i::workers] for i in range(workers)]
+        with ProcessPoolExecutor(workers) as executor:
+            results = list(executor.map(check_games, chunks, [name] * workers, [difficulty] * workers, [rules] * workers))
+    else:
+        results = [check_games(games, name, difficulty, rules)]
+    order = {game["seed"]: index for index, game in enumerate(games)}
+    divergences = sorted((divergence for _, chunk in results for divergence in chunk), key=lambda divergence: order[divergence.seed])
+    return {
+        "strategy": name,
+        "difficulty": difficulty,
+        "rules_changed": name == ClipsStrategy.name and rules_digest(rules) != header["rules"],
+        "games": len(games),
+        "positions": sum(positions for positions, _ in results),
+        "divergences": divergences,
+    }
+
+def format_divergence(divergence:Divergence):
+    lines = [f"game {divergence.seed}, move {divergence.turn}: expected {tuple(divergence.expected)}, got {tuple(divergence.actual)}",
+             divergence.board]
+    if divergence.agenda or divergence.rules:
+        lines.append("agenda at the start of the turn:")
+        lines.extend("  " + activation for activation in divergence.agenda)
+        lines.append("rules fired:")
+        lines.extend("  " + activation for activation in divergence.rules)
+    return "\n".join(lines)
+
+
+# LOCAL MAIN
+if __name__ == "__main__":
+    import sys
+    import time
+    command = sys.argv[1] if len(sys.argv) > 1 else "check"
+    file_name = sys.argv[2] if len(sys.argv) > 2 else GOLDEN_FILE
+    start = time.perf_counter()
+    if command == "record":
+        name = sys.argv[3] if len(sys.argv) > 3 else ClipsStrategy.name
+        difficulty = int(sys.argv[4]) if len(sys.argv) > 4 else 2
+        games = int(sys.argv[5]) if len(sys.argv) > 5 else GOLDEN_GAMES
+        header = record(file_name, name, difficulty, games)
+        print(f"{games} games of {name} on level {difficulty} in {file_name}, rules {header['rules']}, "
+              f"{time.perf_counter() - start:.1f}s")
+    elif command == "check":
+        name = sys.argv[3] if len(sys.argv) > 3 and sys.argv[3] != "-" else None
+        rules = sys.argv[4] if len(sys.argv) > 4 else RULES_FILE
+        workers = int(sys.argv[5]) if len(sys.argv) > 5 else 1
+        report = check(file_name, name, rules, workers)
+        divergences = report["divergences"]
+        print(f"{report['strategy']} on level {report['difficulty']}: {report['positions']} positions in {report['games']} games, "
+              f"{len(divergences)} games diverged, {time.perf_counter() - start:.1f}s"
+              + (" (rule base changed)" if report["rules_changed"] else ""))
+        if divergences:
+            print(format_divergence(divergences[0]))
+            sys.exit(1)
+    else:
+        raise SystemExit(f"Unknown command {command}, use record or check")
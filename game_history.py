@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 11:40:07 2026
+
+@authors: Catalin.BUTACU, Serban.VICOL, Nicu.TARADACIUC
+"""
+
+# LIBS
+import mmap
+import struct
+from array import array
+from collections import namedtuple
+
+from game_bitboard import Bitboard
+
+# GLOBALS
+HISTORY_FILE = "map_history.bin"
+GAME_HISTORY_FILE = "map_history_{seed}.bin"   # one log per game in the UI, named after the game seed
+HISTORY_MAGIC = b"BSHL"
+HISTORY_VERSION = 1
+
+# header: magic, version, event size, number of events, game seed
+HEADER = struct.Struct("<4sHHIQ")
+# event: turn, actor, ability, row, col, result, arg
+EVENT = struct.Struct("<HBBBBBB")
+
+JUCATOR = 0
+SISTEM = 1
+
+# same ids as the Ability class, plus ship placement
+BOMB = 1
+SCAN = 2
+LINE_ATTACK = 3
+PLACE = 4
+
+MISS = 0
+HIT = 1
+
+# the abilities as the rule base and Move write them
+ABILITY_IDS = {"B": BOMB, "S": SCAN, "AL": LINE_ATTACK}
+
+HistoryEvent = namedtuple("HistoryEvent", "turn actor ability row col result arg")
+
+
+"""
+    MoveHistory - WRITER
+    > append-only log of fixed width events (8 bytes) in a memory-mapped file
+    > placements are recorded on turn 0, every attack/scan opens a new turn
+    > keep an index turn -> first event, saved next to the log as <file>.idx
+    > result: 0/1 for a bomb, number of new hits for a line attack, ship cells found for a scan,
+      the ship id for a placement (arg keeps size + 16 * orientation)
+    > the seed of the game is kept in the header, the same seed replays the same fleet and system moves
+
+"""
+class MoveHistory:
+    def __init__(self, filename:str=HISTORY_FILE, capacity:int=256, seed:int=0):
+        self.filename = filename
+        self.seed = seed
+        self.turn = 0
+        self.count = 0
+        self.turn_index = array('I', [0])
+        self.file = open(filename, 'w+b')
+        self.buffer = None
+        self.capacity = 0
+        self.grow(capacity)
+        HEADER.pack_into(self.buffer, 0, HISTORY_MAGIC, HISTORY_VERSION, EVENT.size, 0, seed)
+
+    def grow(self, capacity:int):
+        if self.buffer is not None:
+            self.buffer.flush()
+            self.buffer.close()
+        self.file.truncate(HEADER.size + capacity * EVENT.size)
+        self.buffer = mmap.mmap(self.file.fileno(), 0)
+        self.capacity = capacity
+
+    def append(self, actor, ability, row, col, result=0, arg=0):
+        if self.buffer is None:
+            return
+        if self.count == self.capacity:
+            self.grow(self.capacity * 2)
+        if ability != PLACE:
+            self.turn += 1
+            self.turn_index.append(self.count)
+        EVENT.pack_into(self.buffer, HEADER.size + self.count * EVENT.size,
+                        self.turn, actor, ability, row, col, result, arg)
+        self.count += 1
+        struct.pack_into("<I", self.buffer, 8, self.count)
+
+    def record_ship(self, actor, x, y, size, orientation, ship_id):
+        self.append(actor, PLACE, x, y, ship_id, size + 16 * orientation)
+
+    def record_fleet(self, actor, layout):
+        for ship_id, (x, y, size, orientation) in enumerate(layout, start=1):
+            self.record_ship(actor, x, y, size, orientation, ship_id)
+
+    def flush(self):
+        if self.buffer is None:
+            return
+        self.buffer.flush()
+        with open(self.filename + ".idx", 'wb') as file:
+            self.turn_index.tofile(file)
+
+    def close(self):
+        if self.buffer is None:
+            return
+        self.flush()
+        self.buffer.close()
+        self.buffer = None
+        self.file.truncate(HEADER.size + self.count * EVENT.size)
+        self.file.close()
+
+
+def history_filename(seed:int):
+    return GAME_HISTORY_FILE.format(seed=seed)
+
+
+"""
+    HistoryReader - READER
+    > zero-copy access to the events of a log, opened read-only with mmap
+    > events_until(turn) uses the turn index, without decoding the events before it
+
+"""
+class HistoryReader:
+    def __init__(self, filename:str=HISTORY_FILE):
+        with open(filename, 'rb') as file:
+            self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, event_size, count, seed = HEADER.unpack_from(self.buffer, 0)
+        if magic != HISTORY_MAGIC or event_size != EVENT.size:
+            raise ValueError(f"{filename} is not a move history log")
+        self.version = version
+        self.count = count
+        self.seed = seed
+        self.turn_index = array('I')
+        try:
+            with open(filename + ".idx", 'rb') as file:
+                self.turn_index.frombytes(file.read())
+        except FileNotFoundError:
+            self.turn_index = self.build_index()
+
+    def build_index(self):
+        turn_index = array('I', [0])
+        for i in range(self.count):
+            if self[i].ability != PLACE:
+                turn_index.append(i)
+        return turn_index
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        return HistoryEvent(*EVENT.unpack_from(self.buffer, HEADER.size + i * EVENT.size))
+
+    def __iter__(self):
+        return self.events_until()
+
+    @property
+    def turns(self):
+        return len(self.turn_index) - 1
+
+    def events_until(self, turn=None):
+        if turn is None or turn >= self.turns:
+            end = self.count
+        else:
+            end = self.turn_index[turn + 1]
+        for offset in range(HEADER.size, HEADER.size + end * EVENT.size, EVENT.size):
+            yield HistoryEvent(*EVENT.unpack_from(self.buffer, offset))
+
+    def close(self):
+        self.buffer.close()
+
+
+# REPLAY
+def apply_event(boards, event):
+    # boards[actor] is the terrain owned by actor, attacks land on the other one
+    if event.ability == PLACE:
+        boards[event.actor].place(event.row, event.col, event.arg % 16, event.arg // 16, event.result)
+        return
+    target = boards[1 - event.actor]
+    if event.ability == BOMB:
+        target.bomb(event.row, event.col)
+    elif event.ability == LINE_ATTACK:
+        target.line_attack(event.row)
+
+def replay(filename:str=HISTORY_FILE, turn=None, squares:int=10):
+    # (user terrain, system terrain) as they were at the end of the given turn
+    boards = (Bitboard(squares), Bitboard(squares))
+    reader = HistoryReader(filename)
+    try:
+        for event in reader.events_until(turn):
+            apply_event(boards, event)
+    finally:
+        reader.close()
+    return boards
+
+
+# LOCAL MAIN
+if __name__ == "__main__":
+    import sys
+    reader = HistoryReader(sys.argv[1] if len(sys.argv) > 1 else HISTORY_FILE)
+    print(f"{len(reader)} events, {reader.turns} turns, seed {reader.seed}")
+    for event in reader:
+        print(event)
+    reader.close()
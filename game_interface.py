@@ -7,25 +7,77 @@ Created on Fri Apr 19 11:14:16 2024
 
 # LIBS DEPENDENCIES
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from PyQt5.QtWidgets import QApplication, QMainWindow
 from PyQt5.QtCore import QCoreApplication, QTimer
 
 # LOCAL WIDGETS
 from UI.ModuleWidgets import StartGameWidget, GamePlayWidget, EndGameWidget
-from UI.DataCollector import GameState, MapState
+from UI.DataCollector import GameState
 
 # CLIPS ENV
-import clips
-from game_engine import init_sistem_env, write_matrix_to_file 
+from game_engine import init_sistem_env
 from game_engine import get_clips_state
 from game_engine import execute_update_file_map_using_matrix
 from game_engine import execute_update_matrix_using_file_map
+from game_engine import execute_set_difficulty, execute_seed, execute_external_attacks, execute_read_line_attack, HALT_FILES
+from game_seed import derive_seed, STRATEGY, CLIPS
+from game_telemetry import TelemetrySink, record_move
+from game_strategy import get_strategy, apply_move, DIFFICULTY_STRATEGY, ClipsStrategy, HuntTargetStrategy
+from game_bitboard import Bitboard
+from game_opening import load_opening_book
+from game_history import ABILITY_IDS, BOMB, LINE_ATTACK
+
+# GLOBALS
+WAIT_RESPONSES = 10 # timer ticks waiting for the rule base to give the turn back
+MOVE_POLL = 20 # ms between two looks at a system move computed off the UI thread
+
+# the sampler runs in the thread of the UI executor, no process pool next to Qt
+STRATEGY_OPTIONS = {"monte_carlo": {"workers": 1}}
+
+
+# HELPERS
+def timed_move(strategy, board, difficulty:int):
+    # (move, seconds spent) of a strategy, run in the executor of the UI
+    start = time.perf_counter()
+    move = strategy.next_move(board, difficulty)
+    return move, time.perf_counter() - start
+
+def clips_turn_moves(before, after, line):
+    # the attacks of a rule base turn for the history: the line attack, then the bombs;
+    # a line the turn didn't finish (halted, files) is logged as the bombs that landed
+    geometry = after.geometry
+    new_cells = after.attacked & ~before.attacked
+    moves = []
+    if line is not None and not geometry.row_masks[line] & ~after.attacked:
+        row = geometry.row_masks[line]
+        moves.append((LINE_ATTACK, line, 0, bin(new_cells & row & after.ships).count("1")))
+        new_cells &= ~row
+    moves.extend((BOMB, x, y, int(after.ships & geometry.cell_mask(x, y) != 0)) for x, y in geometry.iter_cells(new_cells))
+    return moves
+
 
 class BattleshipUI(QMainWindow):
-    def __init__(self):
+    def __init__(self, seed=None):
         super().__init__()
         print("BattleshipUI created...")
+        self.seed = seed
+        self.telemetry = TelemetrySink()
+        self.turn = 0
+        self.turn_start = None
+        self.rules_fired = None
+        self.halted = None
         self.state = GameState.LOADING
+        self.difficulty = 1
+        # the first shots of the system, until one hits, come from the book on every level
+        self.book = load_opening_book()
+        self.strategy = self.make_strategy()
+        # plays the turns the rule base couldn't finish
+        self.fallback = HuntTargetStrategy()
+        # the sampler of level 3 takes a while, the system moves are computed out of the UI thread
+        self.executor = ThreadPoolExecutor(1)
+        self.pending_move = None
         self.init_window()
         self.scene_start = None
         self.scene_play = None
@@ -40,7 +92,9 @@ class BattleshipUI(QMainWindow):
         self.raise_()
         self.timer = QTimer()
         self.timer.setInterval(1000)
-        self.wait_responses = 10
+        self.wait_responses = WAIT_RESPONSES
+        self.move_timer = QTimer()
+        self.move_timer.setInterval(MOVE_POLL)
 
     def center_window(self):
         screen_geometry = QCoreApplication.instance().desktop().screenGeometry()
@@ -50,10 +104,13 @@ class BattleshipUI(QMainWindow):
 
     def launch_game(self):
         self.scene_start = StartGameWidget()
-        self.scene_play = GamePlayWidget()
+        self.scene_play = GamePlayWidget(self.seed)
         self.setCentralWidget(self.scene_start)
         self.connect_signals()
         init_sistem_env()
+        execute_seed(derive_seed(self.scene_play.seed, CLIPS))
+        self.strategy.seed(derive_seed(self.scene_play.seed, STRATEGY))
+        self.fallback.seed(derive_seed(self.scene_play.seed, STRATEGY))
         self.isFirstTime = True
 
 
@@ -61,36 +118,107 @@ class BattleshipUI(QMainWindow):
         self.scene_start.signal_start_game.connect(self.start_game)
         self.scene_start.signal_name_changed.connect(self.scene_play.set_username)
         self.scene_start.signal_level_changed.connect(self.scene_play.set_difficulty)
+        self.scene_start.signal_level_changed.connect(self.set_difficulty)
         self.scene_start.signal_change_state.connect(self.update_state)
         self.scene_play.signal_update_clips_map_request.connect(self.update_into_clips_map)
+        self.scene_play.signal_game_over.connect(self.end_game)
         self.timer.timeout.connect(self.update_from_clips_map)
+        self.move_timer.timeout.connect(self.finish_system_turn)
+
+    def set_difficulty(self, difficulty:int):
+        self.difficulty = int(difficulty)
+        self.strategy.close()
+        self.strategy = self.make_strategy(derive_seed(self.scene_play.seed, STRATEGY))
+        execute_set_difficulty(self.difficulty)
+
+    def make_strategy(self, seed=None):
+        options = STRATEGY_OPTIONS.get(DIFFICULTY_STRATEGY[self.difficulty], {})
+        return get_strategy(self.difficulty, book=self.book, seed=seed, **options)
 
     def update_into_clips_map(self, matrix:dict):
-        execute_update_file_map_using_matrix(matrix)
+        if self.pending_move is not None:
+            return
+        board = self.scene_play.user_widget.terrain_widget.board
+        if DIFFICULTY_STRATEGY[self.difficulty] != ClipsStrategy.name \
+                or self.strategy.book_move(board, self.difficulty) is not None:
+            self.play_system_turn()
+            return
+
+        self.turn_start = time.perf_counter()
+        # the first run reads the terrain from map_start.txt, the ships come from the placement;
+        # the terrain is loaded once the turn could start
+        self.rules_fired, self.halted = execute_update_file_map_using_matrix(matrix, board, self.isFirstTime)
+        if self.halted == HALT_FILES:
+            self.play_system_turn(self.fallback)
+            return
+        self.isFirstTime = False
+        self.wait_responses = WAIT_RESPONSES
         self.timer.start()
-        if self.isFirstTime == True:
-            write_matrix_to_file("map_start.txt", matrix)
 
-        self.isFirstTime = False
+    def play_system_turn(self, strategy=None):
+        # Python strategies answer without the map files and the CLIPS polling, the move is computed
+        # in the executor on a copy of the user terrain and finish_system_turn plays it once ready
+        if self.pending_move is not None:
+            return
+        strategy = strategy or self.strategy
+        board = self.scene_play.user_widget.terrain_widget.board.copy()
+        self.pending_move = (self.executor.submit(timed_move, strategy, board, self.difficulty), strategy, board)
+        self.move_timer.start()
+
+    def finish_system_turn(self):
+        future, strategy, board = self.pending_move
+        if not future.done():
+            return
+        self.move_timer.stop()
+        self.pending_move = None
+        try:
+            move, latency = future.result()
+        except Exception as e:
+            print(f"System move failed, the fallback plays it: {e}")
+            strategy = self.fallback
+            move, latency = timed_move(strategy, board, self.difficulty)
+        # the move is played on the terrain Bitboard itself, its hashes follow the attacked cells
+        board = self.scene_play.user_widget.terrain_widget.board
+        attacked = board.attacked
+        result = apply_move(board, move, self.difficulty)
+        if not self.isFirstTime:
+            # the rule base read the terrain already, it must see the attacks it didn't make (fallback, book)
+            execute_external_attacks(board, board.attacked & ~attacked)
+        record_move(self.telemetry, strategy, self.difficulty, move, result, latency,
+                    seed=self.scene_play.seed, turn=self.turn)
+        self.turn += 1
+        self.scene_play.user_widget.update_map_from_board(attacked, [(ABILITY_IDS[move.ability], move.row, move.col, result)])
 
     def update_from_clips_map(self):
         wait_user_input = get_clips_state()
         if wait_user_input:
-            print("Matrice sistem actualizata")
             matrix = execute_update_matrix_using_file_map()
-            self.scene_play.user_widget.update_map_from_file(matrix)
+            # the map file is the only place the rule base writes its attacks to, the one terrain built from a matrix
+            before = self.scene_play.user_widget.terrain_widget.board
+            after = Bitboard.from_matrix(matrix)
             self.timer.stop()
+            if self.halted and not after.attacked & ~before.attacked:
+                # halted before attacking anything, the fallback plays the turn
+                self.play_system_turn(self.fallback)
+                return
+            self.scene_play.user_widget.update_map_from_file(matrix, clips_turn_moves(before, after, execute_read_line_attack()), after)
+            self.record_clips_turn(before, after)
+            return
 
         self.wait_responses -= 1
-        if self.wait_responses != 0:
-            print("\n\nWaiting for Expert System to respond...\n")
-            print('######### Afisarea bazei de fapte #########')
-            for fact in clips.Environment().facts():
-                print(fact)
-
-        else:
+        if self.wait_responses == 0:
             print("\n\nExpert System failed to respond...")
             self.timer.stop()
+            self.play_system_turn(self.fallback)
+
+    def record_clips_turn(self, before, after):
+        # the rule base attacks through the map files, one record for the whole turn
+        new_cells = after.attacked & ~before.attacked
+        self.telemetry.record(strategy="clips_files", difficulty=self.difficulty, seed=self.scene_play.seed, turn=self.turn,
+                              cells=bin(new_cells).count("1"), result=bin(new_cells & after.ships).count("1"),
+                              latency_ms=1000 * (time.perf_counter() - self.turn_start), rules_fired=self.rules_fired,
+                              halted=self.halted)
+        self.turn += 1
 
 
 
@@ -101,7 +229,11 @@ class BattleshipUI(QMainWindow):
         self.center_window()
 
     def end_game(self, result):
+        self.timer.stop()
+        self.move_timer.stop()
+        self.pending_move = None
         if self.scene_play:
+            self.scene_play.history.close()
             self.scene_play.deleteLater()
         self.scene_stop = EndGameWidget(result)
         self.setCentralWidget(self.scene_stop)
@@ -110,23 +242,12 @@ class BattleshipUI(QMainWindow):
     def restart_game(self):
         if self.scene_stop:
             self.scene_stop.deleteLater()
+        self.seed = None
         self.launch_game()
 
     def update_state(self, state):
         self.state = state
 
-    def check_ships_still_alive(self):
-        user_data = self.scene_play.user_widget.terrain_widget.data
-        sistem_data = self.scene_play.enemy_widget.terrain_widget.data
-
-        ships_user = sum(row.count(MapState.SHIP_PLACED) for row in user_data["state"])
-        ships_sistem = sum(row.count(MapState.SHIP_PLACED) for row in sistem_data["state"])
-
-        if ships_user == 0:
-            self.end_game("LOSE")
-        elif ships_sistem == 0:
-            self.end_game("WIN")
-
 
 
 
@@ -143,10 +264,16 @@ def main():
     app = QApplication(sys.argv)
     load_styles_from_file(app, "UI/styles.qss")
 
-    game_ui = BattleshipUI()
+    # python game_interface.py --seed N replays the same game
+    seed = int(sys.argv[sys.argv.index("--seed") + 1]) if "--seed" in sys.argv else None
+    game_ui = BattleshipUI(seed)
     game_ui.show()
 
-    sys.exit(app.exec_())
+    code = app.exec_()
+    game_ui.executor.shutdown()
+    game_ui.strategy.close()
+    game_ui.telemetry.close()
+    sys.exit(code)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 25 11:03:52 2026
+
+@authors: Catalin.BUTACU, Serban.VICOL, Nicu.TARADACIUC
+"""
+
+# LIBS
+import asyncio
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from game_engine import get_live_sessions
+from game_server import GameServer, GameSession, StrategyPool
+from game_client import run_load, SQUARES
+from game_seed import derive_seed, STRATEGY
+
+try:
+    import resource
+except ImportError:   # Windows
+    resource = None
+
+# GLOBALS
+RAMP = (1, 2, 4, 8, 16)
+GAMES_PER_CLIENT = 2
+INPROCESS = "inprocess"
+SERVER = "server"
+
+
+# MEASURES
+def rss_bytes():
+    # resident memory of the process, from /proc when available, else the peak from getrusage; 0 if unknown
+    if resource is None:
+        return 0
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def percentiles(latencies):
+    # p50, p95, p99 in milliseconds
+    if len(latencies) < 2:
+        value = 1000 * latencies[0] if latencies else 0.0
+        return value, value, value
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return 1000 * cuts[49], 1000 * cuts[94], 1000 * cuts[98]
+
+def clips_memory():
+    # (CLIPS environments alive, bytes used by them)
+    sessions = get_live_sessions()
+    return len(sessions), sum(session.memory_used() for session in sessions)
+
+
+# IN PROCESS
+def play_session_game(pool:StrategyPool, game_id:int, difficulty:int, seed, latencies):
+    # the scripted game of game_client, straight on a GameSession
+    game = GameSession(game_id, difficulty, pool.acquire(difficulty, derive_seed(seed, STRATEGY)), seed)
+    game.place_fleet()
+    cells = [(x, y) for x in range(SQUARES) for y in range(SQUARES)]
+    random.Random(seed).shuffle(cells)
+    try:
+        for x, y in cells:
+            start = time.perf_counter()
+            response = game.submit_move("B", x, y)
+            latencies.append(time.perf_counter() - start)
+            if response["winner"]:
+                break
+    finally:
+        pool.release(game.strategy)
+
+def run_inprocess(concurrency:int, games:int, difficulty:int, pool:StrategyPool):
+    latencies = []
+
+    def client(index):
+        for game in range(games):
+            game_id = index * games + game
+            play_session_game(pool, game_id, difficulty, game_id, latencies)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        list(executor.map(client, range(concurrency)))
+    return latencies, time.perf_counter() - start, clips_memory()
+
+async def run_server(concurrency:int, games:int, difficulty:int):
+    server = GameServer(port=0, pool_size=concurrency, workers=concurrency)
+    await server.start()
+    latencies = []
+    start = time.perf_counter()
+    try:
+        for _ in range(games):
+            _, level_latencies, _ = await run_load(concurrency, difficulty, server.host, server.port)
+            latencies.extend(level_latencies)
+        elapsed = time.perf_counter() - start
+        memory = clips_memory()
+    finally:
+        await server.close()
+    return latencies, elapsed, memory
+
+
+# RAMP
+def run_level(mode:str, concurrency:int, difficulty:int, games:int=GAMES_PER_CLIENT, pool=None):
+    rss_before = rss_bytes()
+    if mode == INPROCESS:
+        latencies, elapsed, memory = run_inprocess(concurrency, games, difficulty, pool or StrategyPool(concurrency))
+    else:
+        latencies, elapsed, memory = asyncio.run(run_server(concurrency, games, difficulty))
+    environments, clips_bytes = memory
+    p50, p95, p99 = percentiles(latencies)
+    return {
+        "mode": mode,
+        "concurrency": concurrency,
+        "difficulty": difficulty,
+        "moves": len(latencies),
+        "moves_s": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": p50,
+        "p95_ms": p95,
+        "p99_ms": p99,
+        "rss_per_session": max(rss_bytes() - rss_before, 0) / concurrency,
+        "clips_envs": environments,
+        "clips_per_env": clips_bytes / environments if environments else 0,
+    }
+
+def ramp(mode:str=INPROCESS, difficulty:int=2, levels=RAMP, games:int=GAMES_PER_CLIENT):
+    # one run per concurrency level; in process the pool stays between levels, like on a long running host
+    pool = StrategyPool(max(levels)) if mode == INPROCESS else None
+    results = []
+    for concurrency in levels:
+        results.append(run_level(mode, concurrency, difficulty, games, pool))
+        yield results[-1]
+    if pool is not None:
+        pool.close()
+
+def format_result(result:dict):
+    return (f"{result['mode']:>9} x{result['concurrency']:<3} {result['moves_s']:9.1f} moves/s  "
+            f"p50 {result['p50_ms']:7.2f}  p95 {result['p95_ms']:7.2f}  p99 {result['p99_ms']:7.2f} ms  "
+            f"rss/session {result['rss_per_session'] / 1024:8.0f} KiB  "
+            f"clips envs {result['clips_envs']:3} ({result['clips_per_env'] / 1024:.0f} KiB each)")
+
+
+# LOCAL MAIN
+if __name__ == "__main__":
+    import sys
+    mode = sys.argv[1] if len(sys.argv) > 1 else INPROCESS
+    difficulty = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    levels = tuple(int(level) for level in sys.argv[3].split(",")) if len(sys.argv) > 3 else RAMP
+    if mode not in (INPROCESS, SERVER):
+        raise SystemExit(f"Unknown mode {mode}, use {INPROCESS} or {SERVER}")
+    for result in ramp(mode, difficulty, levels):
+        print(format_result(result))
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Nov  5 10:04:18 2026
+
+@authors: Catalin.BUTACU, Serban.VICOL, Nicu.TARADACIUC
+"""
+
+# LIBS
+import json
+import time
+from functools import lru_cache
+
+from game_bitboard import get_geometry, DIFFICULTIES, SYMMETRIES
+from game_placement import USER_FLEET
+
+# GLOBALS
+BOOK_FILE = "opening_book.json"
+BOOK_VERSION = 1
+BOOK_SAMPLES = 1000000   # fleets placed to measure how often every cell is covered
+BOOK_CHUNK = 50000       # fleets placed at once
+MAX_DEPTH = 20           # shots of a line at most
+MIN_SUPPORT = 2000       # a line stops when fewer sampled fleets are left than this
+
+# the cells a level may open on: the checkerboard of hunt/target on the easy level, any cell above
+ALL_CELLS = "all"
+PARITY = "parity"
+BOOK_CELLS = {1: PARITY, 2: ALL_CELLS, 3: ALL_CELLS}
+
+
+def book_symmetries(geometry, difficulty:int):
+    # the symmetries a line of the level can be played through
+    if BOOK_CELLS.get(difficulty) != PARITY:
+        return tuple(range(len(SYMMETRIES)))
+    parity = geometry.parity_masks[0]
+    return tuple(symmetry for symmetry in range(len(SYMMETRIES)) if geometry.transform_mask(parity, symmetry) == parity)
+
+
+"""
+    OpeningBook
+    > before the first hit the system only knows its misses, the same in every game that followed
+      the book: one line of shots per (terrain size, difficulty), each shot the cell covered by most
+      of the sampled fleets that none of the shots before it touched
+    > position(squares, difficulty, attacked) gives the next shot in one dict lookup, keyed by
+      the attacked cells; None once a shot hit or the terrain left the line
+    > a game plays the line through one of the symmetries of the terrain; symmetries(squares, difficulty)
+      keeps only those that map the checkerboard of a parity line onto itself (on an even terrain the
+      quarter turns and the mirrors swap the two colors)
+    > the lines are built offline (build) and shipped in opening_book.json
+
+"""
+class OpeningBook:
+    def __init__(self, data:dict):
+        if data.get("version") != BOOK_VERSION:
+            raise ValueError(f"Opening book version {data.get('version')} not supported")
+        self.fleet = tuple(sorted(data["fleet"]))
+        self.samples = data["samples"]
+        self.lines = {}
+        self.positions = {}
+        self.symmetry_sets = {}
+        for key, line in data["lines"].items():
+            squares, difficulty = (int(part) for part in key.split(":"))
+            geometry = get_geometry(squares)
+            self.lines[squares, difficulty] = line
+            self.symmetry_sets[squares, difficulty] = book_symmetries(geometry, difficulty)
+            attacked = 0
+            for x, y, _ in line:
+                self.positions[squares, difficulty, attacked] = (x, y)
+                attacked |= geometry.cell_mask(x, y)
+
+    def position(self, squares:int, difficulty:int, attacked):
+        return self.positions.get((squares, difficulty, attacked))
+
+    def symmetries(self, squares:int, difficulty:int):
+        return self.symmetry_sets.get((squares, difficulty), ())
+
+    def matches_fleet(self, board):
+        return tuple(sorted(bin(mask).count("1") for mask in board.ship_masks.values())) == self.fleet
+
+
+@lru_cache(maxsize=None)
+def load_opening_book(filename:str=BOOK_FILE):
+    # one read-only book per file, shared by every strategy
+    with open(filename, 'r', encoding="utf-8") as file:
+        return OpeningBook(json.load(file))
+
+
+# BUILD
+def sample_coverage(squares:int, fleet, samples:int, seed:int):
+    # (samples, cells) booleans, the cells covered by every fleet placed like FleetGenerator does
+    import numpy as np
+    from game_batch import BatchGames
+    rng = np.random.default_rng(seed)
+    chunks = []
+    for start in range(0, samples, BOOK_CHUNK):
+        batch = BatchGames(min(BOOK_CHUNK, samples - start), squares, fleet, seed=rng.integers(1 << 63))
+        chunks.append(batch.ship_ids > 0)
+    return np.concatenate(chunks)
+
+def build_line(coverage, allowed, max_depth:int=MAX_DEPTH, min_support:int=MIN_SUPPORT):
+    # greedy line: the allowed cell covered by most fleets still possible, then drop the fleets it would hit
+    import numpy as np
+    squares = int(round(coverage.shape[1] ** 0.5))
+    alive = np.ones(len(coverage), bool)
+    allowed = allowed.copy()
+    line = []
+    while len(line) < max_depth and allowed.any() and alive.sum() >= min_support:
+        counts = coverage[alive].sum(axis=0)
+        counts[~allowed] = -1
+        cell = int(counts.argmax())
+        line.append([cell // squares, cell % squares, round(counts[cell] / alive.sum(), 4)])
+        alive &= ~coverage[:, cell]
+        allowed[cell] = False
+    return line
+
+def build(squares_list=(10,), fleet=USER_FLEET, samples:int=BOOK_SAMPLES, seed:int=0,
+          max_depth:int=MAX_DEPTH, min_support:int=MIN_SUPPORT):
+    # the data of opening_book.json; the line of every size and difficulty, with the hit chance of every shot
+    import numpy as np
+    lines = {}
+    for squares in squares_list:
+        geometry = get_geometry(squares)
+        coverage = sample_coverage(squares, fleet, samples, seed)
+        parity = np.array([bool(geometry.parity_masks[0] >> i & 1) for i in range(geometry.cells)])
+        for difficulty in DIFFICULTIES:
+            allowed = parity if BOOK_CELLS[difficulty] == PARITY else np.ones(geometry.cells, bool)
+            lines[f"{squares}:{difficulty}"] = build_line(coverage, allowed, max_depth, min_support)
+    return {"version": BOOK_VERSION, "fleet": list(fleet), "samples": samples, "seed": seed, "lines": lines}
+
+def save_book(data:dict, filename:str=BOOK_FILE):
+    # one line of the file per opening line, the file stays readable in a diff
+    lines = ",\n".join(f'    "{key}": {json.dumps(line)}' for key, line in data["lines"].items())
+    header = json.dumps({key: value for key, value in data.items() if key != "lines"})[:-1]
+    with open(filename, 'w', encoding="utf-8") as file:
+        file.write(f'{header}, "lines": {{\n{lines}\n}}}}\n')
+
+
+# LOCAL MAIN
+if __name__ == "__main__":
+    import sys
+    filename = sys.argv[1] if len(sys.argv) > 1 else BOOK_FILE
+    samples = int(sys.argv[2]) if len(sys.argv) > 2 else BOOK_SAMPLES
+    squares_list = tuple(int(squares) for squares in sys.argv[3].split(",")) if len(sys.argv) > 3 else (10,)
+    start = time.perf_counter()
+    data = build(squares_list, samples=samples)
+    save_book(data, filename)
+    print(f"{filename}: {samples} fleets per size, {time.perf_counter() - start:.1f}s")
+    for key, line in data["lines"].items():
+        print(f"  {key}: {len(line)} shots, first {line[0][:2]} hits {line[0][2]:.1%}")
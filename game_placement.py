@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 10:02:11 2026
+
+@authors: Catalin.BUTACU, Serban.VICOL, Nicu.TARADACIUC
+"""
+
+# LIBS
+import random
+
+from UI.DataCollector import MapState, Ship
+from game_bitboard import get_geometry
+
+# GLOBALS
+ENEMY_FLEET = (4, 3, 3, 2, 2, 2, 1, 1, 1)
+USER_FLEET = (4, 3, 3, 2, 2, 2, 1, 1, 1, 1)   # the ship buttons of the user terrain
+MAX_RESTARTS = 10000   # whole layouts tried before giving up, about 1 in 5 fits on a 10x10 terrain
+
+
+"""
+    FleetGenerator
+    > use the placement masks precomputed by the terrain geometry for every ship size
+    > uniform over whole layouts: every ship is drawn between all its placements, a layout where
+      two ships overlap is rejected and drawn again from scratch; choosing between the placements
+      left after the first ships would favour some layouts over others
+    > never drops a ship
+    > seedable, two generators with the same seed give the same layouts
+
+"""
+class FleetGenerator:
+    def __init__(self, squares:int=10, seed=None):
+        self.squares = squares
+        self.geometry = get_geometry(squares)
+        self.rng = random.Random(seed)
+
+    def seed(self, seed):
+        self.rng.seed(seed)
+
+    def generate(self, sizes=ENEMY_FLEET):
+        # list of (x, y, size, orientation), one entry for each ship in sizes
+        for _ in range(MAX_RESTARTS):
+            layout = self.try_generate(sizes)
+            if layout is not None:
+                return layout
+        raise ValueError(f"Fleet {tuple(sizes)} doesn't fit on a {self.squares}x{self.squares} terrain")
+
+    def try_generate(self, sizes):
+        # one layout drawn ship by ship, None as soon as a ship overlaps the ones before it
+        occupied = 0
+        layout = []
+        for size in sizes:
+            x, y, orientation, mask = self.rng.choice(self.geometry.get_placements(size))
+            if mask & occupied:
+                return None
+            occupied |= mask
+            layout.append((x, y, size, orientation))
+        return layout
+
+    def generate_many(self, count:int, sizes=ENEMY_FLEET):
+        return [self.generate(sizes) for _ in range(count)]
+
+
+# HELPERS
+def ship_cells(x, y, size, orientation):
+    if orientation == Ship.HORIZONTAL:
+        return [(x, y + i) for i in range(size)]
+    return [(x + i, y) for i in range(size)]
+
+def layout_to_matrix(layout, squares:int=10):
+    matrix_state = [[MapState.SPACE_FREE.value] * squares for _ in range(squares)]
+    matrix_ids = [[0] * squares for _ in range(squares)]
+    for ship_id, (x, y, size, orientation) in enumerate(layout, start=1):
+        for i, j in ship_cells(x, y, size, orientation):
+            matrix_state[i][j] = MapState.SHIP_PLACED.value
+            matrix_ids[i][j] = ship_id
+    return {"state": matrix_state, "ids": matrix_ids}
+
+
+# LOCAL MAIN
+if __name__ == "__main__":
+    import time
+    generator = FleetGenerator(seed=0)
+    start = time.perf_counter()
+    layouts = generator.generate_many(10000)
+    elapsed = time.perf_counter() - start
+    print(f"{len(layouts)} layouts in {elapsed:.3f}s ({len(layouts) / elapsed:.0f} layouts/s)")
+    for row in layout_to_matrix(layouts[0])["ids"]:
+        print(' '.join(str(item) for item in row))
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 31 10:26:48 2026
+
+@authors: Catalin.BUTACU, Serban.VICOL, Nicu.TARADACIUC
+"""
+
+# LIBS
+from collections import Counter
+
+from game_bitboard import get_geometry
+
+# GLOBALS
+SUNK = "sunk"
+GAME_OVER = "game_over"
+
+
+"""
+    ShipRegistry - FLEET STATUS
+    > the cells not hit yet of every ship of a terrain, updated with the cells of each shot
+    > a hit costs one lookup (cell -> ship) and one decrement, no rescan of the terrain
+    > listeners are called with (event, ship_id, size): SUNK for every ship sunk, then GAME_OVER
+      with the last one when the whole fleet is sunk
+    > afloat_sizes keeps the ships still afloat by size, what the fleet status shows
+
+"""
+class ShipRegistry:
+    def __init__(self, squares:int=10):
+        self.geometry = get_geometry(squares)
+        self.ships = 0
+        self.hits = 0
+        self.cell_ship = {}     # cell index -> ship id
+        self.sizes = {}
+        self.remaining = {}     # ship id -> cells not hit yet
+        self.afloat = 0
+        self.afloat_sizes = Counter()
+        self.listeners = []
+
+    @classmethod
+    def from_board(cls, board):
+        registry = cls(board.geometry.squares)
+        for ship_id, mask in board.ship_masks.items():
+            registry.add_ship(ship_id, mask)
+        registry.record(board.attacked, notify=False)
+        return registry
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def add_ship(self, ship_id, mask):
+        size = bin(mask).count("1")
+        self.ships |= mask
+        self.sizes[ship_id] = self.remaining[ship_id] = size
+        self.afloat += 1
+        self.afloat_sizes[size] += 1
+        while mask:
+            low = mask & -mask
+            self.cell_ship[low.bit_length() - 1] = ship_id
+            mask ^= low
+
+    def record(self, cells, notify:bool=True):
+        # cells attacked by one shot, the ones already hit are skipped; returns the ids of the ships sunk by it
+        new_hits = cells & self.ships & ~self.hits
+        self.hits |= new_hits
+        sunk = []
+        while new_hits:
+            low = new_hits & -new_hits
+            ship_id = self.cell_ship[low.bit_length() - 1]
+            self.remaining[ship_id] -= 1
+            if not self.remaining[ship_id]:
+                self.afloat -= 1
+                self.afloat_sizes[self.sizes[ship_id]] -= 1
+                sunk.append(ship_id)
+            new_hits ^= low
+        if notify:
+            for ship_id in sunk:
+                self.emit(SUNK, ship_id)
+            if sunk and self.game_over:
+                self.emit(GAME_OVER, sunk[-1])
+        return sunk
+
+    def emit(self, event:str, ship_id):
+        for listener in self.listeners:
+            listener(event, ship_id, self.sizes[ship_id])
+
+    def is_sunk(self, ship_id):
+        return not self.remaining[ship_id]
+
+    @property
+    def game_over(self):
+        return bool(self.sizes) and not self.afloat
@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Nov  2 09:38:14 2026
+
+@authors: Catalin.BUTACU, Serban.VICOL, Nicu.TARADACIUC
+"""
+
+# LIBS
+import os
+import struct
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+
+from game_bitboard import Bitboard
+from game_history import HistoryReader, apply_event, PLACE, SCAN, LINE_ATTACK, SISTEM
+from game_strategy import apply_move, Move
+from UI.DataCollector import PATH_H, PATH_V, Ship
+
+# GLOBALS
+TILE = 40            # the grid_size of TerrainWidget, the artwork is cut in tiles of this size
+GAP = 20             # between the two terrains of a history frame
+DELAY = 250          # ms per frame of an animation
+HOLD = 4             # the last frame stays HOLD times longer
+COMPRESSION = 6
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# the colors of styles.qss and of the X drawn by place_bomb
+SEA = (0x88, 0xdc, 0xff)
+SEA_ATTACKED = (0xb3, 0xe7, 0xfc)
+BORDER = (0x57, 0xce, 0xff)
+HIT = (0xff, 0x00, 0x00)
+MISS = (0x5d, 0x3f, 0xd3)
+HIGHLIGHT = (0xff, 0xff, 0x00)
+BACKGROUND = (0xff, 0xff, 0xff)
+
+# every cell is one of the layouts: sea, a ship not shown (sea, but a hit is red), then
+# (size, orientation, part of the ship) for the sizes with artwork
+SEA_LAYOUT = 0
+HIDDEN_LAYOUT = 1
+LAYOUTS = [None, None] + [(size, orientation, part) for size in sorted(PATH_H)
+                          for orientation in (Ship.HORIZONTAL, Ship.VERTICAL) for part in range(size)]
+LAYOUT_INDEX = {layout: index for index, layout in enumerate(LAYOUTS) if layout is not None}
+# tile code = layout * 4 + attacked * 2 + highlighted
+STATES = 4
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+# ARTWORK
+def artwork_path(path:str):
+    # the UI paths use Windows separators and are relative to the game folder
+    return os.path.join(ROOT, *path.split("\\"))
+
+def load_artwork(path:str, width:int, height:int):
+    # RGBA pixels of an image scaled like place_ship does; QImage needs no QApplication, nor a display
+    from PyQt5.QtCore import Qt
+    from PyQt5.QtGui import QImage
+    image = QImage(artwork_path(path))
+    if image.isNull():
+        raise FileNotFoundError(f"Can't load the artwork {path}")
+    image = image.scaled(width, height, Qt.IgnoreAspectRatio, Qt.SmoothTransformation).convertToFormat(QImage.Format_RGBA8888)
+    pixels = image.constBits()
+    pixels.setsize(image.byteCount())
+    return np.frombuffer(pixels, np.uint8).reshape(height, image.bytesPerLine())[:, :width * 4].reshape(height, width, 4).copy()
+
+def cross_mask(tile:int, width:int):
+    # the X of an attacked cell, over the middle half of the tile
+    r, c = np.mgrid[0:tile, 0:tile]
+    inside = (r >= tile // 4) & (r < tile - tile // 4) & (c >= tile // 4) & (c < tile - tile // 4)
+    return inside & ((np.abs(r - c) <= width / 2) | (np.abs(r + c - (tile - 1)) <= width / 2))
+
+@lru_cache(maxsize=None)
+def tile_atlas(tile:int=TILE):
+    # every tile a terrain can show, indexed by the tile code; built once per process
+    sea = np.empty((tile, tile, 3), np.float32)
+    ship_parts = {}
+    for size in PATH_H:
+        horizontal = load_artwork(PATH_H[size], size * tile, tile)
+        vertical = load_artwork(PATH_V[size], tile, size * tile)
+        for part in range(size):
+            ship_parts[size, Ship.HORIZONTAL, part] = horizontal[:, part * tile:(part + 1) * tile]
+            ship_parts[size, Ship.VERTICAL, part] = vertical[part * tile:(part + 1) * tile]
+    hit, miss = cross_mask(tile, tile / 10), cross_mask(tile, tile / 20)
+    outline = np.ones((tile, tile), bool)
+    outline[2:-2, 2:-2] = False
+    atlas = np.empty((len(LAYOUTS) * STATES, tile, tile, 3), np.uint8)
+    for index, layout in enumerate(LAYOUTS):
+        for attacked in (0, 1):
+            sea[:] = SEA_ATTACKED if attacked else SEA
+            sea[0], sea[-1], sea[:, 0], sea[:, -1] = BORDER, BORDER, BORDER, BORDER
+            cell = sea.copy()
+            if layout is not None:
+                part = ship_parts[layout].astype(np.float32)
+                alpha = part[..., 3:] / 255
+                cell = cell * (1 - alpha) + part[..., :3] * alpha
+            if attacked:
+                ship = index != SEA_LAYOUT
+                cell[hit if ship else miss] = HIT if ship else MISS
+            for highlighted in (0, 1):
+                code = index * STATES + attacked * 2 + highlighted
+                atlas[code] = cell
+                if highlighted:
+                    atlas[code][outline] = HIGHLIGHT
+    return atlas
+
+
+# FRAMES
+def ship_layout(board):
+    # layout index of every cell, the ships don't move during a game so it is computed once per fleet
+    layout = np.zeros(board.geometry.cells, np.intp)
+    for mask in board.ship_masks.values():
+        cells = list(board.geometry.iter_cells(mask))
+        orientation = Ship.VERTICAL if len(cells) > 1 and cells[0][1] == cells[1][1] else Ship.HORIZONTAL
+        for part, (x, y) in enumerate(cells):
+            layout[board.geometry.index(x, y)] = LAYOUT_INDEX[len(cells), orientation, part]
+    return layout
+
+def mask_bits(mask, cells:int):
+    # the bits of a mask as a 0/1 array, cell index order
+    data = np.frombuffer(mask.to_bytes((cells + 7) // 8, "little"), np.uint8)
+    return np.unpackbits(data, bitorder="little")[:cells].astype(np.intp)
+
+def render_board(board, layout=None, highlight=0, reveal:bool=True, tile:int=TILE):
+    # RGB image of a terrain; without reveal only the sunk ships are drawn, like the enemy terrain in the game
+    squares, cells = board.geometry.squares, board.geometry.cells
+    if layout is None:
+        layout = ship_layout(board)
+    if not reveal:
+        layout = np.where(mask_bits(board.sunk_mask(), cells), layout, np.minimum(layout, HIDDEN_LAYOUT))
+    codes = layout * STATES + mask_bits(board.attacked, cells) * 2 + mask_bits(highlight, cells)
+    tiles = tile_atlas(tile)[codes].reshape(squares, squares, tile, tile, 3)
+    return tiles.transpose(0, 2, 1, 3, 4).reshape(squares * tile, squares * tile, 3)
+
+def side_by_side(images, gap:int=GAP):
+    # the terrains of one moment in one frame
+    height = max(image.shape[0] for image in images)
+    frame = np.empty((height, sum(image.shape[1] for image in images) + gap * (len(images) - 1), 3), np.uint8)
+    frame[:] = BACKGROUND
+    left = 0
+    for image in images:
+        frame[:image.shape[0], left:left + image.shape[1]] = image
+        left += image.shape[1] + gap
+    return frame
+
+def move_mask(board, move:Move, difficulty:int):
+    # the cells touched by a move, highlighted in its frame
+    geometry = board.geometry
+    if move.ability == SCAN:
+        return geometry.scan_window(move.row, move.col, difficulty)
+    if move.ability == LINE_ATTACK:
+        return geometry.row_masks[move.row]
+    return geometry.cell_mask(move.row, move.col)
+
+
+# PNG
+def chunk(kind:bytes, data:bytes):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+def image_data(image, level:int=COMPRESSION):
+    # filter 0 on every row, RGB 8 bits
+    height, width, _ = image.shape
+    rows = np.zeros((height, width * 3 + 1), np.uint8)
+    rows[:, 1:] = image.reshape(height, width * 3)
+    return zlib.compress(rows.tobytes(), level)
+
+def png_header(image):
+    height, width, _ = image.shape
+    return PNG_SIGNATURE + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+
+def encode_png(image, level:int=COMPRESSION):
+    return png_header(image) + chunk(b"IDAT", image_data(image, level)) + chunk(b"IEND", b"")
+
+def changed_region(previous, image):
+    # (top, left, bottom, right) of the pixels that differ, at least one pixel
+    changed = np.any(previous != image, axis=2)
+    rows, cols = np.flatnonzero(changed.any(axis=1)), np.flatnonzero(changed.any(axis=0))
+    if not len(rows):
+        return 0, 0, 1, 1
+    return rows[0], cols[0], rows[-1] + 1, cols[-1] + 1
+
+def encode_apng(frames, delay:int=DELAY, hold:int=HOLD, level:int=COMPRESSION):
+    # animated PNG; the default image is the last frame, what a viewer without APNG support shows
+    # every frame after the first one only keeps the rectangle that changed, drawn over the previous frame
+    last = frames[-1]
+    data = [png_header(last), chunk(b"acTL", struct.pack(">II", len(frames), 0)), chunk(b"IDAT", image_data(last, level))]
+    sequence = 0
+    previous = None
+    for i, image in enumerate(frames):
+        top, left, bottom, right = (0, 0) + image.shape[:2] if previous is None else changed_region(previous, image)
+        frame_delay = delay * hold if i == len(frames) - 1 else delay
+        data.append(chunk(b"fcTL", struct.pack(">IIIIIHHBB", sequence, right - left, bottom - top, left, top,
+                                               frame_delay, 1000, 0, 0)))
+        data.append(chunk(b"fdAT", struct.pack(">I", sequence + 1) + image_data(image[top:bottom, left:right], level)))
+        sequence += 2
+        previous = image
+    data.append(chunk(b"IEND", b""))
+    return b"".join(data)
+
+def save_png(image, filename:str):
+    with open(filename, "wb") as file:
+        file.write(encode_png(image))
+
+def save_apng(frames, filename:str, delay:int=DELAY):
+    with open(filename, "wb") as file:
+        file.write(encode_apng(frames, delay))
+
+
+# GAMES
+def golden_frames(board, moves, difficulty:int, tile:int=TILE):
+    # the terrain before the first move and after every move of a golden game, the move highlighted
+    layout = ship_layout(board)
+    frames = [render_board(board, layout, tile=tile)]
+    for ability, row, col, _ in moves:
+        move = Move(ability, row, col)
+        apply_move(board, move, difficulty)
+        frames.append(render_board(board, layout, move_mask(board, move, difficulty), tile=tile))
+    return frames
+
+def history_frames(filename:str, turn=None, squares:int=10, difficulty:int=2, tile:int=TILE):
+    # both terrains after the placements and after every turn of a history log, user terrain on the left
+    boards = (Bitboard(squares), Bitboard(squares))
+    layouts = None
+    frames = []
+    reader = HistoryReader(filename)
+    try:
+        for event in reader.events_until(turn):
+            apply_event(boards, event)
+            if event.ability == PLACE:
+                continue
+            if layouts is None:
+                layouts = [ship_layout(board) for board in boards]
+                frames.append(side_by_side([render_board(board, layout, tile=tile) for board, layout in zip(boards, layouts)]))
+            target = 1 - event.actor
+            highlight = move_mask(boards[target], Move(event.ability, event.row, event.col), difficulty)
+            frames.append(side_by_side([render_board(board, layout, highlight if i == target else 0, reveal=i != SISTEM, tile=tile)
+                                        for i, (board, layout) in enumerate(zip(boards, layouts))]))
+    finally:
+        reader.close()
+    return frames
+
+def render_games(games, difficulty:int, out_dir:str, tile:int=TILE):
+    # one APNG per golden game, named after its seed; returns the number of frames drawn
+    from game_golden import fleet_board
+    frames = 0
+    for game in games:
+        images = golden_frames(fleet_board(game["seed"]), game["moves"], difficulty, tile)
+        save_apng(images, os.path.join(out_dir, f"{game['seed']}.png"))
+        frames += len(images)
+    return frames
+
+def render_golden(file_name:str, out_dir:str, workers:int=1, tile:int=TILE):
+    # the games of a golden trace split between worker processes, every worker keeps its own tile atlas
+    from game_golden import load_golden
+    header, games = load_golden(file_name)
+    os.makedirs(out_dir, exist_ok=True)
+    if workers > 1:
+        chunks = [games[i::workers] for i in range(workers)]
+        with ProcessPoolExecutor(workers) as executor:
+            frames = sum(executor.map(render_games, chunks, [header["difficulty"]] * workers, [out_dir] * workers, [tile] * workers))
+    else:
+        frames = render_games(games, header["difficulty"], out_dir, tile)
+    return len(games), frames
+
+
+# LOCAL MAIN
+if __name__ == "__main__":
+    import sys
+    command = sys.argv[1] if len(sys.argv) > 1 else "golden"
+    start = time.perf_counter()
+    if command == "golden":
+        from game_golden import GOLDEN_FILE
+        file_name = sys.argv[2] if len(sys.argv) > 2 else GOLDEN_FILE
+        out_dir = sys.argv[3] if len(sys.argv) > 3 else "renders"
+        workers = int(sys.argv[4]) if len(sys.argv) > 4 else os.cpu_count()
+        games, frames = render_golden(file_name, out_dir, workers)
+        elapsed = time.perf_counter() - start
+        print(f"{games} games, {frames} frames in {out_dir}, {elapsed:.1f}s ({frames / elapsed * 60:.0f} frames/min)")
+    elif command == "history":
+        from game_history import HISTORY_FILE
+        file_name = sys.argv[2] if len(sys.argv) > 2 else HISTORY_FILE
+        out_file = sys.argv[3] if len(sys.argv) > 3 else "history.png"
+        turn = int(sys.argv[4]) if len(sys.argv) > 4 else None
+        frames = history_frames(file_name, turn)
+        if not frames:
+            raise SystemExit(f"{file_name} has no turns")
+        if turn is None:
+            save_apng(frames, out_file)
+        else:
+            save_png(frames[-1], out_file)
+        print(f"{len(frames)} frames of {file_name} in {out_file}, {time.perf_counter() - start:.1f}s")
+    else:
+        raise SystemExit(f"Unknown command {command}, use golden or history")
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 23 16:20:45 2026
+
+@authors: Catalin.BUTACU, Serban.VICOL, Nicu.TARADACIUC
+"""
+
+# LIBS
+import os
+import random
+import time
+
+from game_bitboard import get_geometry
+
+# GLOBALS
+MOVE_BUDGET = 0.1     # seconds spent sampling for one move
+MAX_SAMPLES = 20000   # configurations kept between turns
+MAX_WORKERS = 4
+BATCH = 64            # configurations tried between two looks at the clock
+REPRODUCIBLE_ATTEMPTS = 2000   # tries per move when a run must be reproducible
+SAMPLE_CHUNKS = MAX_WORKERS    # seeded pieces of the tries of a move, whatever the number of workers
+
+
+"""
+    Observation
+    > what the attacker knows about a terrain: misses, hits of ships still afloat, sunk cells
+      and the sizes of the ships still afloat
+    > a sampled configuration is the mask of the cells covered by the ships still afloat
+
+"""
+class Observation:
+    def __init__(self, misses, open_hits, sunk, sizes):
+        self.misses = misses
+        self.open_hits = open_hits
+        self.sunk = sunk
+        self.sizes = tuple(sorted(sizes, reverse=True))
+
+    @classmethod
+    def from_board(cls, board):
+        sunk = board.sunk_mask()
+        sizes = [bin(mask).count("1") for mask in board.ship_masks.values() if mask & ~sunk]
+        return cls(board.misses, board.hits & ~sunk, sunk, sizes)
+
+    def is_consistent(self, configuration):
+        return not configuration & (self.misses | self.sunk) and configuration & self.open_hits == self.open_hits
+
+
+# SAMPLING
+def sample_configurations(squares, misses, open_hits, sunk, sizes, budget, seed, attempts=None):
+    # configurations consistent with the observation, sampled with rejection until the budget ends: every ship
+    # between all its placements, a configuration with two ships overlapping is dropped whole like in FleetGenerator,
+    # so every consistent configuration is as likely; with attempts the number of tries is fixed instead,
+    # the same seed gives the same configurations
+    geometry = get_geometry(squares)
+    rng = random.Random(seed)
+    forbidden = misses | sunk
+    placements = {size: [p[3] for p in geometry.get_placements(size) if not p[3] & forbidden] for size in set(sizes)}
+    configurations = []
+    if not all(placements.values()):
+        return configurations
+    deadline = time.perf_counter() + budget
+    batches = -(-attempts // BATCH) if attempts is not None else None
+    while time.perf_counter() < deadline if batches is None else batches > 0:
+        if batches is not None:
+            batches -= 1
+        for _ in range(BATCH):
+            occupied = 0
+            for size in sizes:
+                mask = rng.choice(placements[size])
+                if mask & occupied:
+                    occupied = None
+                    break
+                occupied |= mask
+            if occupied is not None and occupied & open_hits == open_hits:
+                configurations.append(occupied)
+    return configurations
+
+def cell_counts(configurations, cells:int):
+    # in how many configurations every cell holds a ship
+    counts = [0] * cells
+    for mask in configurations:
+        while mask:
+            low = mask & -mask
+            counts[low.bit_length() - 1] += 1
+            mask ^= low
+    return counts
+
+
+"""
+    ConfigurationSampler
+    > keep the configurations consistent with the last observation and reuse them on the next turn,
+      only the ones contradicted by the new shots are dropped; a sunk ship restarts the sampling
+    > the budget of a move is split between worker processes when more than one core is available,
+      the processes are spawned: the sampler may run in a thread of a process that can't be forked (Qt)
+    > with attempts, every move tries a fixed number of configurations instead of using the clock,
+      split in SAMPLE_CHUNKS seeded chunks run on the workers; the runs are then reproducible
+      for a given seed, on one worker or on many
+
+"""
+class ConfigurationSampler:
+    def __init__(self, squares:int=10, budget:float=MOVE_BUDGET, workers=None, seed=None, attempts=None):
+        self.squares = squares
+        self.budget = budget
+        self.attempts = attempts
+        self.workers = workers or min(os.cpu_count() or 1, MAX_WORKERS)
+        self.rng = random.Random(seed)
+        self.executor = None
+        self.configurations = []
+        self.sizes = None
+
+    def seed(self, seed):
+        self.rng.seed(seed)
+
+    def reset(self):
+        self.configurations = []
+        self.sizes = None
+
+    def update(self, observation:Observation):
+        # drop the configurations contradicted by the observation, sample new ones for the budget
+        if observation.sizes != self.sizes:
+            self.configurations = []
+            self.sizes = observation.sizes
+        self.configurations = [c for c in self.configurations if observation.is_consistent(c)]
+        if observation.sizes:
+            self.configurations.extend(self.sample(observation))
+        del self.configurations[:-MAX_SAMPLES]
+        return self.configurations
+
+    def sample(self, observation:Observation):
+        args = (self.squares, observation.misses, observation.open_hits, observation.sunk, observation.sizes, self.budget)
+        if self.attempts is not None:
+            # the chunks and their seeds don't depend on the workers, only who runs them does
+            chunks = [(self.rng.getrandbits(32), -(-self.attempts // SAMPLE_CHUNKS)) for _ in range(SAMPLE_CHUNKS)]
+        else:
+            chunks = [(self.rng.getrandbits(32), None) for _ in range(self.workers)]
+        if self.workers == 1:
+            return [c for seed, attempts in chunks for c in sample_configurations(*args, seed, attempts)]
+        if self.executor is None:
+            import multiprocessing  # multiprocessing only when it's used
+            from concurrent.futures import ProcessPoolExecutor
+            self.executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        futures = [self.executor.submit(sample_configurations, *args, seed, attempts) for seed, attempts in chunks]
+        return [c for future in futures for c in future.result()]
+
+    def probabilities(self, observation:Observation):
+        # ship probability of every cell, None when no configuration was found
+        configurations = self.update(observation)
+        if not configurations:
+            return None
+        total = len(configurations)
+        return [count / total for count in cell_counts(configurations, self.squares * self.squares)]
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+
+# LOCAL MAIN
+if __name__ == "__main__":
+    from game_bitboard import Bitboard
+    from game_placement import FleetGenerator, ENEMY_FLEET
+
+    board = Bitboard()
+    for ship_id, (x, y, size, orientation) in enumerate(FleetGenerator(seed=0).generate(ENEMY_FLEET), start=1):
+        board.place(x, y, size, orientation, ship_id)
+    for x, y in ((0, 0), (4, 4), (5, 5), (9, 9)):
+        board.bomb(x, y)
+
+    sampler = ConfigurationSampler(seed=0)
+    start = time.perf_counter()
+    probabilities = sampler.probabilities(Observation.from_board(board))
+    elapsed = time.perf_counter() - start
+    print(f"{len(sampler.configurations)} configurations in {elapsed:.3f}s on {sampler.workers} worker(s)")
+    for x in range(board.geometry.squares):
+        print(' '.join(f"{p:.2f}" for p in probabilities[x * 10:x * 10 + 10]))
+    sampler.close()
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 26 09:31:17 2026
+
+@authors: Catalin.BUTACU, Serban.VICOL, Nicu.TARADACIUC
+"""
+
+# LIBS
+import random
+
+# GLOBALS
+SEED_BITS = 32   # fits the reserved field of the history header and a CLIPS integer
+
+# one random stream for every consumer of the game seed
+FLEET = "fleet"
+STRATEGY = "strategy"
+CLIPS = "clips"
+OPENING = "opening"
+
+
+# HELPERS
+def new_game_seed():
+    return random.SystemRandom().getrandbits(SEED_BITS)
+
+def derive_seed(seed, label:str):
+    # independent seed for one consumer, the same on every run and platform; None stays unseeded
+    if seed is None:
+        return None
+    return random.Random(f"{seed}:{label}").getrandbits(SEED_BITS)
+
+def rng_state(rng:random.Random):
+    # the state of a random stream as JSON lists, set_rng_state continues it from the same point
+    version, internal, gauss = rng.getstate()
+    return [version, list(internal), gauss]
+
+def set_rng_state(rng:random.Random, state):
+    version, internal, gauss = state
+    rng.setstate((version, tuple(internal), gauss))
@@ -0,0 +1,414 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 24 10:12:38 2026
+
+@authors: Catalin.BUTACU, Serban.VICOL, Nicu.TARADACIUC
+"""
+
+# LIBS
+import asyncio
+import base64
+import itertools
+import json
+import threading
+import time
+import traceback
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from game_bitboard import Bitboard
+from game_placement import FleetGenerator, ENEMY_FLEET, USER_FLEET
+from game_registry import ShipRegistry
+import game_snapshot
+from game_seed import new_game_seed, derive_seed, rng_state, set_rng_state, FLEET, STRATEGY
+from game_telemetry import NullSink, record_move
+from game_opening import load_opening_book
+from game_strategy import get_strategy, apply_move, Move, DIFFICULTY_STRATEGY, BOMB, SCAN, LINE_ATTACK
+from UI.DataCollector import MapState
+
+# GLOBALS
+HOST = "127.0.0.1"
+PORT = 8765
+POOL_SIZE = 8          # idle strategies kept for every strategy name
+EXECUTOR_WORKERS = 4   # threads running the system turns
+
+# same limits as the ability buttons of the enemy terrain
+ABILITY_LIMITS = {BOMB: 200, SCAN: 1, LINE_ATTACK: 2}
+
+# one process pool per game would multiply with the sessions, the server runs the sampler in its threads
+STRATEGY_OPTIONS = {"monte_carlo": {"workers": 1}}
+
+JUCATOR = "JUCATOR"
+SISTEM = "SISTEM"
+
+
+class GameError(Exception):
+    pass
+
+
+"""
+    StrategyPool
+    > keep the strategies of finished games, the CLIPS ones with their loaded EngineSession,
+      so a new game doesn't load main.clp again
+    > thread safe, games take and give back strategies from the executor threads
+
+"""
+class StrategyPool:
+    def __init__(self, size:int=POOL_SIZE):
+        self.size = size
+        self.idle = {}
+        self.created = 0
+        self.lock = threading.Lock()
+
+    def acquire(self, difficulty:int, seed=None):
+        name = DIFFICULTY_STRATEGY[difficulty]
+        with self.lock:
+            idle = self.idle.get(name)
+            strategy = idle.pop() if idle else None
+        if strategy is None:
+            strategy = get_strategy(difficulty, book=load_opening_book(), **STRATEGY_OPTIONS.get(name, {}))
+            with self.lock:
+                self.created += 1
+        strategy.seed(seed)
+        strategy.reset()
+        return strategy
+
+    def release(self, strategy):
+        with self.lock:
+            idle = self.idle.setdefault(strategy.name, [])
+            if len(idle) < self.size:
+                idle.append(strategy)
+                return
+        strategy.close()
+
+    def close(self):
+        with self.lock:
+            strategies = [strategy for idle in self.idle.values() for strategy in idle]
+            self.idle = {}
+        for strategy in strategies:
+            strategy.close()
+
+
+"""
+    GameSession
+    > one game between a remote player and the system, without any widget
+    > user terrain: the fleet placed by the player; enemy terrain: a fleet from FleetGenerator
+    > the player keeps attacking while hitting, scans don't end the turn;
+      the system then attacks with its strategy until it misses, like in the rule base
+    > a ShipRegistry per terrain tells the ships sunk by every move and when a fleet is gone
+    > the fleets come from the game seed, the strategy is seeded from it by whoever gives it
+    > a system turn that raises leaves the game failed: the player's move and the attacks played
+      before the error stay, every next move is refused
+    > snapshot() is the whole game as JSON friendly data (see game_snapshot), from_snapshot() resumes it
+      with a fresh or pooled strategy, without replaying the moves
+
+"""
+class GameSession:
+    def __init__(self, game_id:int, difficulty:int, strategy, seed:int, telemetry=None):
+        self.game_id = game_id
+        self.difficulty = difficulty
+        self.strategy = strategy
+        self.seed = seed
+        self.telemetry = telemetry or NullSink()
+        self.generator = FleetGenerator(seed=derive_seed(seed, FLEET))
+        self.user = Bitboard()
+        self.enemy = Bitboard()
+        for ship_id, (x, y, size, orientation) in enumerate(self.generator.generate(ENEMY_FLEET), start=1):
+            self.enemy.place(x, y, size, orientation, ship_id)
+        self.user_fleet = ShipRegistry()
+        self.enemy_fleet = ShipRegistry.from_board(self.enemy)
+        self.abilities = dict(ABILITY_LIMITS)
+        self.fleet_placed = False
+        self.winner = None
+        self.failed = None
+        self.moves = 0
+
+    def place_fleet(self, fleet=None):
+        # fleet: list of [x, y, size, orientation], a random one when missing
+        if self.fleet_placed:
+            raise GameError("Fleet already placed")
+        fleet = fleet or self.generator.generate(USER_FLEET)
+        # the shape of every ship is checked before any of them is unpacked
+        if not isinstance(fleet, (list, tuple)) or not all(isinstance(ship, (list, tuple)) and len(ship) == 4 for ship in fleet):
+            raise GameError("The fleet must be a list of [x, y, size, orientation]")
+        try:
+            fleet = [tuple(int(value) for value in ship) for ship in fleet]
+        except (TypeError, ValueError):
+            raise GameError("The positions, sizes and orientations of the ships must be integers")
+        if sorted(ship[2] for ship in fleet) != sorted(USER_FLEET):
+            raise GameError(f"The fleet must have the ships {USER_FLEET}")
+        board = Bitboard()
+        for ship_id, (x, y, size, orientation) in enumerate(fleet, start=1):
+            if not board.place(x, y, size, orientation, ship_id):
+                raise GameError(f"Ship {ship_id} can't be placed at {x} {y}")
+        self.user = board
+        self.user_fleet = ShipRegistry.from_board(board)
+        self.fleet_placed = True
+
+    def submit_move(self, ability:str, row:int, col:int=0):
+        # player move, followed by the system turn when the player's turn ended
+        if not self.fleet_placed:
+            raise GameError("Place the fleet first")
+        if self.failed:
+            raise GameError(f"Game failed in the system turn: {self.failed}")
+        if self.winner:
+            raise GameError(f"Game over, {self.winner} won")
+        if self.abilities.get(ability, 0) <= 0:
+            raise GameError(f"Ability {ability} not available")
+        if not (0 <= row < self.enemy.geometry.squares and 0 <= col < self.enemy.geometry.squares):
+            raise GameError(f"Position {row} {col} outside the terrain")
+        if ability == BOMB and self.enemy.attacked & self.enemy.geometry.cell_mask(row, col):
+            raise GameError(f"Position {row} {col} already attacked")
+
+        self.abilities[ability] -= 1
+        result = apply_move(self.enemy, Move(ability, row, col), self.difficulty)
+        self.moves += 1
+        sunk = self.enemy_fleet.record(self.enemy.attacked)
+        system_moves, lost = [], []
+        if self.enemy_fleet.game_over:
+            self.winner = JUCATOR
+        elif ability != SCAN and not result:
+            try:
+                system_moves, lost = self.system_turn()
+            except Exception as e:
+                self.failed = f"{type(e).__name__}: {e}"
+                raise
+        # sunk: enemy ships sunk by the player, lost: ships of the player sunk by the system
+        return {"result": result, "system_moves": system_moves, "winner": self.winner, "sunk": sunk, "lost": lost}
+
+    def system_turn(self):
+        moves, lost = [], []
+        while not self.user_fleet.game_over:
+            start = time.perf_counter()
+            move = self.strategy.next_move(self.user, self.difficulty)
+            latency = time.perf_counter() - start
+            result = apply_move(self.user, move, self.difficulty)
+            record_move(self.telemetry, self.strategy, self.difficulty, move, result, latency,
+                        game=self.game_id, seed=self.seed, turn=self.moves)
+            moves.append([move.ability, move.row, move.col, result])
+            lost.extend(self.user_fleet.record(self.user.attacked))
+            if not result:
+                break
+        if self.user_fleet.game_over:
+            self.winner = SISTEM
+        return moves, lost
+
+    def snapshot(self):
+        return {
+            "game_id": self.game_id,
+            "difficulty": self.difficulty,
+            "seed": self.seed,
+            "user": self.user.to_state(),
+            "enemy": self.enemy.to_state(),
+            "abilities": self.abilities,
+            "fleet_placed": self.fleet_placed,
+            "winner": self.winner,
+            "failed": self.failed,
+            "moves": self.moves,
+            "generator": rng_state(self.generator.rng),
+            "strategy": self.strategy.snapshot(),
+        }
+
+    @classmethod
+    def from_snapshot(cls, state:dict, strategy, game_id=None, telemetry=None):
+        if strategy.name != state["strategy"]["name"]:
+            raise GameError(f"The game was played by {state['strategy']['name']}, not {strategy.name}")
+        game = cls.__new__(cls)
+        game.game_id = state["game_id"] if game_id is None else game_id
+        game.difficulty = state["difficulty"]
+        game.strategy = strategy
+        game.seed = state["seed"]
+        game.telemetry = telemetry or NullSink()
+        game.generator = FleetGenerator()
+        set_rng_state(game.generator.rng, state["generator"])
+        game.user = Bitboard.from_state(state["user"])
+        game.enemy = Bitboard.from_state(state["enemy"])
+        game.user_fleet = ShipRegistry.from_board(game.user)
+        game.enemy_fleet = ShipRegistry.from_board(game.enemy)
+        game.abilities = dict(state["abilities"])
+        game.fleet_placed = state["fleet_placed"]
+        game.winner = state["winner"]
+        game.failed = state.get("failed")
+        game.moves = state["moves"]
+        strategy.restore(state["strategy"])
+        return game
+
+    def get_board(self, terrain:str="user"):
+        # the enemy terrain is sent the way the player sees it, without the ships not hit yet
+        if terrain == "user":
+            return self.user.to_matrix()["state"]
+        if terrain == "enemy":
+            hidden = MapState.SHIP_PLACED.value
+            return [[MapState.SPACE_FREE.value if state == hidden else state for state in row]
+                    for row in self.enemy.to_matrix()["state"]]
+        raise GameError(f"Unknown terrain {terrain}")
+
+
+"""
+    GameServer - ASYNCIO
+    > JSON lines over TCP: {"id": .., "cmd": .., ...} -> {"id": .., "ok": true, ...} / {"ok": false, "error": ..}
+    > commands: create_game, place_fleet, submit_move, get_board, close_game,
+      snapshot_game / restore_game with the snapshot as base64, to move a game to another server
+    > every game belongs to its connection, the games are closed when the connection drops
+    > the system turns run in a thread executor, the event loop never waits for CLIPS
+
+"""
+class GameServer:
+    def __init__(self, host:str=HOST, port:int=PORT, pool_size:int=POOL_SIZE, workers:int=EXECUTOR_WORKERS, telemetry=None):
+        self.host = host
+        self.port = port
+        self.telemetry = telemetry or NullSink()
+        self.pool = StrategyPool(pool_size)
+        self.executor = ThreadPoolExecutor(workers)
+        self.game_ids = itertools.count(1)
+        self.games = {}
+        self.server = None
+        self.commands = {
+            "create_game": self.create_game,
+            "place_fleet": self.place_fleet,
+            "submit_move": self.submit_move,
+            "get_board": self.get_board,
+            "close_game": self.close_game,
+            "snapshot_game": self.snapshot_game,
+            "restore_game": self.restore_game,
+        }
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.server
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        for game_id in list(self.games):
+            self.drop_game(game_id)
+        self.executor.shutdown()
+        self.pool.close()
+
+    async def handle_client(self, reader, writer):
+        owned = set()
+        try:
+            while line := await reader.readline():
+                response = await self.dispatch(line, owned)
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for game_id in owned:
+                self.drop_game(game_id)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def dispatch(self, line:bytes, owned:set):
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            command = self.commands.get(request.get("cmd"))
+            if command is None:
+                raise GameError(f"Unknown command {request.get('cmd')}")
+            response = await command(request, owned)
+        except (GameError, ValueError, KeyError, TypeError, zlib.error) as e:
+            return {"id": request_id, "ok": False, "error": str(e)}
+        except Exception as e:
+            # a bug or a CLIPS error: the client gets an answer, the connection stays open
+            print(f"Request {request_id} failed: {type(e).__name__}: {e}")
+            traceback.print_exc()
+            return {"id": request_id, "ok": False, "error": f"Internal error: {type(e).__name__}: {e}"}
+        return {"id": request_id, "ok": True, **response}
+
+    def run(self, function, *args):
+        return asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    def owned_game(self, request, owned:set):
+        game_id = int(request["game"])
+        if game_id not in owned:
+            raise GameError(f"Unknown game {game_id}")
+        return self.games[game_id]
+
+    def drop_game(self, game_id:int):
+        # the strategy of a failed game is not trusted again
+        game = self.games.pop(game_id, None)
+        if game is None:
+            return
+        if game.failed:
+            game.strategy.close()
+        else:
+            self.pool.release(game.strategy)
+
+    # COMMANDS
+    async def create_game(self, request, owned:set):
+        difficulty = int(request.get("difficulty", 1))
+        if difficulty not in DIFFICULTY_STRATEGY:
+            raise GameError(f"Unknown difficulty {difficulty}")
+        seed = request.get("seed")
+        seed = new_game_seed() if seed is None else int(seed)
+        strategy = await self.run(self.pool.acquire, difficulty, derive_seed(seed, STRATEGY))
+        game = GameSession(next(self.game_ids), difficulty, strategy, seed, self.telemetry)
+        self.games[game.game_id] = game
+        owned.add(game.game_id)
+        return {"game": game.game_id, "seed": seed}
+
+    async def place_fleet(self, request, owned:set):
+        self.owned_game(request, owned).place_fleet(request.get("fleet"))
+        return {}
+
+    async def submit_move(self, request, owned:set):
+        game = self.owned_game(request, owned)
+        return await self.run(game.submit_move, request["ability"], int(request["row"]), int(request.get("col", 0)))
+
+    async def get_board(self, request, owned:set):
+        return {"state": self.owned_game(request, owned).get_board(request.get("terrain", "user"))}
+
+    async def close_game(self, request, owned:set):
+        game = self.owned_game(request, owned)
+        owned.discard(game.game_id)
+        self.drop_game(game.game_id)
+        return {}
+
+    async def snapshot_game(self, request, owned:set):
+        game = self.owned_game(request, owned)
+        data = await self.run(lambda: game_snapshot.dumps(game.snapshot()))
+        return {"snapshot": base64.b64encode(data).decode()}
+
+    async def restore_game(self, request, owned:set):
+        state = game_snapshot.loads(base64.b64decode(request["snapshot"]))
+        difficulty = int(state["difficulty"])
+        if difficulty not in DIFFICULTY_STRATEGY:
+            raise GameError(f"Unknown difficulty {difficulty}")
+        strategy = await self.run(self.pool.acquire, difficulty)
+        try:
+            game = await self.run(GameSession.from_snapshot, state, strategy, next(self.game_ids), self.telemetry)
+        except Exception:
+            self.pool.release(strategy)
+            raise
+        self.games[game.game_id] = game
+        owned.add(game.game_id)
+        return {"game": game.game_id, "seed": game.seed}
+
+
+# LOCAL MAIN
+if __name__ == "__main__":
+    import sys
+    from game_telemetry import TelemetrySink
+    telemetry = TelemetrySink()
+    server = GameServer(port=int(sys.argv[1]) if len(sys.argv) > 1 else PORT, telemetry=telemetry)
+    print(f"Battleship server on {server.host}:{server.port}, telemetry in {telemetry.path}")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        telemetry.close()
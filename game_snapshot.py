@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 28 09:52:21 2026
+
+@authors: Catalin.BUTACU, Serban.VICOL, Nicu.TARADACIUC
+"""
+
+# LIBS
+import json
+import os
+import struct
+import zlib
+
+# GLOBALS
+SNAPSHOT_FILE = "game_snapshot.bin"
+SNAPSHOT_MAGIC = b"BSSN"
+SNAPSHOT_VERSION = 1
+
+# header: magic, version; the rest of the file is the state as zlib compressed JSON
+HEADER = struct.Struct("<4sH")
+
+
+# ENCODING
+def dumps(state:dict) -> bytes:
+    # the whole game in one block: a GameSession.snapshot(), sent as is between processes
+    payload = json.dumps(state, separators=(",", ":")).encode()
+    return HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION) + zlib.compress(payload)
+
+def loads(data:bytes) -> dict:
+    if len(data) < HEADER.size:
+        raise ValueError("Not a game snapshot")
+    magic, version = HEADER.unpack_from(data)
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError("Not a game snapshot")
+    if version != SNAPSHOT_VERSION:
+        raise ValueError(f"Snapshot version {version} not supported")
+    return json.loads(zlib.decompress(data[HEADER.size:]))
+
+
+# FILES
+def save_snapshot(state:dict, filename:str=SNAPSHOT_FILE):
+    # written next to the old one and renamed, a crash while saving keeps the previous checkpoint
+    temporary = filename + ".tmp"
+    with open(temporary, "wb") as file:
+        file.write(dumps(state))
+    os.replace(temporary, filename)
+
+def load_snapshot(filename:str=SNAPSHOT_FILE) -> dict:
+    with open(filename, "rb") as file:
+        return loads(file.read())
+
+
+# LOCAL MAIN
+if __name__ == "__main__":
+    import sys
+    state = load_snapshot(sys.argv[1] if len(sys.argv) > 1 else SNAPSHOT_FILE)
+    strategy = state["strategy"]
+    print(f"game {state['game_id']} seed {state['seed']} level {state['difficulty']}, {state['moves']} moves, "
+          f"winner {state['winner']}, strategy {strategy['name']}")
+    if strategy.get("engine"):
+        engine = strategy["engine"]
+        print(f"{len(engine['facts'].splitlines())} facts, {len(engine['globals'])} globals, {len(engine['agenda'])} activations")
@@ -0,0 +1,528 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 14:05:31 2026
+
+@authors: Catalin.BUTACU, Serban.VICOL, Nicu.TARADACIUC
+"""
+
+# LIBS
+import random
+import time
+from collections import namedtuple, OrderedDict
+
+from game_engine import EngineSession
+from game_seed import derive_seed, rng_state, set_rng_state, CLIPS, OPENING, SEED_BITS
+from game_telemetry import record_move
+from game_bitboard import SYMMETRIES, ROW_SYMMETRIES, scan_radius
+from game_sampler import ConfigurationSampler, Observation, MOVE_BUDGET, REPRODUCIBLE_ATTEMPTS
+
+# GLOBALS
+BOMB = "B"
+SCAN = "S"
+LINE_ATTACK = "AL"
+
+# ability, row, col - 0-based, row is the attacked line for AL
+Move = namedtuple("Move", "ability row col")
+
+
+def apply_move(board, move:Move, difficulty:int):
+    # result of the move on the Bitboard: 1/0 for a bomb, new hits for a line attack,
+    # unattacked ship cells for a scan, in the window of the difficulty like the UI and the batch
+    if move.ability == BOMB:
+        return int(board.bomb(move.row, move.col))
+    if move.ability == LINE_ATTACK:
+        return bin(board.line_attack(move.row)).count("1")
+    if move.ability == SCAN:
+        return bin(board.scan(move.row, move.col, scan_radius(difficulty))).count("1")
+    raise ValueError(f"Unknown ability {move.ability}")
+
+def play_game(strategy, board, difficulty:int, max_moves=None, trace=None, sink=None):
+    # let the strategy attack the board until every ship is sunk, returns the number of moves
+    limit = max_moves or board.geometry.cells
+    moves = 0
+    while not board.all_sunk() and moves < limit:
+        start = time.perf_counter()
+        move = strategy.next_move(board, difficulty)
+        latency = time.perf_counter() - start
+        result = apply_move(board, move, difficulty)
+        if trace is not None:
+            trace.append(move)
+        if sink is not None:
+            record_move(sink, strategy, difficulty, move, result, latency, turn=moves)
+        moves += 1
+    return moves
+
+
+"""
+    Strategy - BASE
+    > decide the next Move of the system against the user terrain (a Bitboard)
+    > strategies must only look at what the system knows: attacked cells, hits and sunk ships,
+      except the CLIPS rule base, that reads the real positions like it always did
+    > last_turn tells what the last decision cost (rules fired, samples, cache hit), for the telemetry
+    > snapshot() / restore() carry the random streams and whatever the strategy keeps between moves, JSON friendly
+
+"""
+class Strategy:
+    name = None
+    last_turn = {}
+
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+
+    def seed(self, seed):
+        self.rng.seed(seed)
+
+    def reset(self):
+        pass
+
+    def close(self):
+        pass
+
+    def snapshot(self):
+        return {"name": self.name, "rng": rng_state(self.rng)}
+
+    def restore(self, state:dict):
+        set_rng_state(self.rng, state["rng"])
+
+    def next_move(self, board, difficulty:int) -> Move:
+        raise NotImplementedError
+
+
+"""
+    HuntTargetStrategy - PYTHON
+    > hunt: random bomb on a checkerboard of unattacked cells (every ship longer than 1 crosses it)
+    > target: once a ship is hit and not sunk, bomb next to the hits, along the line when two hits are aligned
+
+"""
+class HuntTargetStrategy(Strategy):
+    name = "hunt_target"
+
+    def next_move(self, board, difficulty:int) -> Move:
+        geometry = board.geometry
+        free = geometry.full & ~board.attacked
+        open_hits = board.hits & ~board.sunk_mask()
+
+        candidates = 0
+        if open_hits:
+            candidates = self.target_cells(board, open_hits) & free
+        if not candidates:
+            candidates = free & geometry.parity_masks[0] or free & geometry.parity_masks[1]
+
+        x, y = self.rng.choice(list(geometry.iter_cells(candidates)))
+        return Move(BOMB, x, y)
+
+    def target_cells(self, board, open_hits):
+        geometry = board.geometry
+        around = 0
+        along = 0
+        for x, y in geometry.iter_cells(open_hits):
+            index = geometry.index(x, y)
+            horizontal, vertical = geometry.h_neighbours[index], geometry.v_neighbours[index]
+            around |= horizontal | vertical
+            if horizontal & open_hits:
+                along |= horizontal
+            if vertical & open_hits:
+                along |= vertical
+        free = geometry.full & ~board.attacked
+        return along & free or around
+
+
+"""
+    ClipsStrategy - EXPERT SYSTEM
+    > main.clp in an EngineSession, the same rules used by the UI through the map files
+    > the session is loaded again when the terrain changed behind its back
+    > falls back to hunt/target when the rules end a turn without attacking
+    > the seed drives the (random ...) calls of the rules too: every turn starts with a CLIPS (seed ...)
+      drawn from clips_rng, so a snapshot only needs that rng and the seed of the current turn
+    > trace_rules is passed to the session, for the reports of game_golden
+
+"""
+class ClipsStrategy(Strategy):
+    name = "clips"
+    trace_rules = False
+
+    def __init__(self, seed=None, file_name:str="main.clp"):
+        super().__init__(seed)
+        self.file_name = file_name
+        self.session = None
+        self.clips_rng = random.Random(derive_seed(seed, CLIPS))
+        self.clips_seed = None
+        self.fallback = HuntTargetStrategy(seed)
+
+    def seed(self, seed):
+        super().seed(seed)
+        self.fallback.seed(seed)
+        self.clips_rng.seed(derive_seed(seed, CLIPS))
+        self.clips_seed = None
+
+    def reset(self):
+        if self.session is not None:
+            self.session.board = None
+
+    def snapshot(self):
+        # the state of (random ...) can't be read from CLIPS, the next turn reseeds it from clips_rng anyway
+        state = {**super().snapshot(), "fallback": self.fallback.snapshot(),
+                 "clips_rng": rng_state(self.clips_rng), "clips_seed": self.clips_seed}
+        return {**state, "engine": self.session.snapshot() if self.session is not None else None}
+
+    def restore(self, state:dict):
+        super().restore(state)
+        self.fallback.restore(state["fallback"])
+        set_rng_state(self.clips_rng, state["clips_rng"])
+        self.clips_seed = state["clips_seed"]
+        if state["engine"] is None:
+            self.reset()
+            return
+        if self.session is None:
+            self.session = EngineSession(self.file_name)
+        self.session.restore(state["engine"])
+        if self.clips_seed is not None:
+            self.session.seed(self.clips_seed)
+
+    def next_move(self, board, difficulty:int) -> Move:
+        if self.session is None:
+            self.session = EngineSession(self.file_name)
+        self.session.trace_rules = self.trace_rules
+        if not self.session.is_synced(board, difficulty):
+            self.session.init(board, difficulty)
+
+        ran = not self.session.pending
+        if ran:
+            self.clips_seed = self.clips_rng.getrandbits(SEED_BITS)
+            self.session.seed(self.clips_seed)
+        move = self.session.system_turn()
+        self.last_turn = dict(self.session.last_run) if ran else {"rules_fired": 0, "facts_delta": 0}
+        if move is None:
+            self.session.board = None
+            self.last_turn["fallback"] = True
+            return self.fallback.next_move(board, difficulty)
+        return Move(*move)
+
+
+"""
+    MonteCarloStrategy - PYTHON
+    > sample fleet configurations consistent with the misses, hits and sunk ships seen so far
+    > bomb the unattacked cell covered by most configurations, ties broken at random
+    > the time spent on a move is bounded by budget, the configurations are reused between turns
+    > attempts replaces the budget with a fixed number of tries per move, for reproducible runs;
+      a seeded strategy uses REPRODUCIBLE_ATTEMPTS when no attempts were given, the clock never decides its moves
+    > falls back to hunt/target when no configuration was found in time
+
+"""
+class MonteCarloStrategy(Strategy):
+    name = "monte_carlo"
+
+    def __init__(self, seed=None, budget:float=MOVE_BUDGET, workers=None, attempts=None):
+        super().__init__(seed)
+        self.budget = budget
+        self.workers = workers
+        self.attempts = attempts
+        self.seeded = seed is not None
+        self.sampler = None
+        self.fallback = HuntTargetStrategy(seed)
+
+    def seed(self, seed):
+        super().seed(seed)
+        self.fallback.seed(seed)
+        self.seeded = seed is not None
+        if self.sampler is not None:
+            self.sampler.seed(seed)
+            self.sampler.attempts = self.sampler_attempts()
+
+    def sampler_attempts(self):
+        if self.attempts is None and self.seeded:
+            return REPRODUCIBLE_ATTEMPTS
+        return self.attempts
+
+    def reset(self):
+        if self.sampler is not None:
+            self.sampler.reset()
+
+    def close(self):
+        if self.sampler is not None:
+            self.sampler.close()
+
+    def snapshot(self):
+        # the configurations are not kept, the restored sampler draws new ones
+        sampler = None
+        if self.sampler is not None:
+            sampler = {"squares": self.sampler.squares, "rng": rng_state(self.sampler.rng)}
+        return {**super().snapshot(), "fallback": self.fallback.snapshot(), "sampler": sampler, "seeded": self.seeded}
+
+    def restore(self, state:dict):
+        super().restore(state)
+        self.fallback.restore(state["fallback"])
+        self.reset()
+        self.seeded = state.get("seeded", False)
+        sampler = state["sampler"]
+        if sampler is not None:
+            if self.sampler is None or self.sampler.squares != sampler["squares"]:
+                self.sampler = ConfigurationSampler(sampler["squares"], self.budget, self.workers, None, self.sampler_attempts())
+            self.sampler.attempts = self.sampler_attempts()
+            set_rng_state(self.sampler.rng, sampler["rng"])
+
+    def next_move(self, board, difficulty:int) -> Move:
+        geometry = board.geometry
+        if self.sampler is None or self.sampler.squares != geometry.squares:
+            self.sampler = ConfigurationSampler(geometry.squares, self.budget, self.workers, self.rng.getrandbits(32), self.sampler_attempts())
+
+        probabilities = self.sampler.probabilities(Observation.from_board(board))
+        self.last_turn = {"configurations": len(self.sampler.configurations)}
+        if probabilities is None:
+            return self.fallback.next_move(board, difficulty)
+        free = [(probabilities[i], self.rng.random(), i) for i in range(geometry.cells) if not board.attacked & geometry.cell_masks[i]]
+        _, _, index = max(free)
+        return Move(BOMB, *geometry.cell(index))
+
+
+"""
+    DecisionCache
+    > bounded LRU of decisions keyed by the visible state of a terrain
+    > counts hits and misses, stats() gives them together with the hit rate
+
+"""
+class DecisionCache:
+    def __init__(self, maxsize:int=100000):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        move = self.entries.get(key)
+        if move is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return move
+
+    def put(self, key, move):
+        self.entries[key] = move
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def canonical_key(board, difficulty:int, symmetries=range(len(SYMMETRIES))):
+    # (key, symmetry) - smallest (attacked, hits, sunk) over the symmetries, remaining fleet, difficulty
+    geometry = board.geometry
+    sunk = board.sunk_mask()
+    remaining = tuple(sorted(bin(mask).count("1") for mask in board.ship_masks.values() if mask & ~sunk))
+    best = None
+    for symmetry in symmetries:
+        state = (geometry.transform_mask(board.attacked, symmetry),
+                 geometry.transform_mask(board.hits, symmetry),
+                 geometry.transform_mask(sunk, symmetry))
+        if best is None or state < best[0]:
+            best = (state, symmetry)
+    return (best[0], remaining, difficulty), best[1]
+
+def transform_move(geometry, move:Move, symmetry:int):
+    # the same move seen through a symmetry; None for a line attack turned into a column
+    if move.ability == LINE_ATTACK:
+        if symmetry not in ROW_SYMMETRIES:
+            return None
+        row, _ = geometry.transform_cell(move.row, 0, symmetry)
+        return Move(LINE_ATTACK, row, 0)
+    return Move(move.ability, *geometry.transform_cell(move.row, move.col, symmetry))
+
+
+"""
+    CachedStrategy - WRAPPER
+    > skip the inner strategy when the same visible terrain was already decided
+    > the terrain is brought to a canonical form over rotations and mirrors before the lookup,
+      the cached move is mapped back to the real terrain
+    > the visible terrain doesn't include the real ship positions, a rule base that reads them
+      (ClipsStrategy) replays the decision it took for another fleet in the same visible position
+
+"""
+class CachedStrategy(Strategy):
+    def __init__(self, inner:Strategy, maxsize:int=100000, use_symmetries:bool=True):
+        super().__init__()
+        self.inner = inner
+        self.name = f"{inner.name}+cache"
+        self.cache = DecisionCache(maxsize)
+        self.symmetries = range(len(SYMMETRIES)) if use_symmetries else (0,)
+
+    def seed(self, seed):
+        self.inner.seed(seed)
+
+    def reset(self):
+        self.inner.reset()
+
+    def close(self):
+        self.inner.close()
+
+    def snapshot(self):
+        return {**self.inner.snapshot(), "name": self.name}
+
+    def restore(self, state:dict):
+        self.inner.restore(state)
+
+    def next_move(self, board, difficulty:int) -> Move:
+        key, symmetry = canonical_key(board, difficulty, self.symmetries)
+        geometry = board.geometry
+        cached = self.cache.get(key)
+        if cached is not None:
+            move = transform_move(geometry, cached, geometry.inverse_symmetry(symmetry))
+            if move is not None:
+                self.last_turn = {"cache_hit": True}
+                return move
+
+        move = self.inner.next_move(board, difficulty)
+        self.last_turn = {"cache_hit": False, **self.inner.last_turn}
+        canonical = transform_move(geometry, move, symmetry)
+        if canonical is not None:
+            self.cache.put(key, canonical)
+        return move
+
+    def stats(self):
+        return self.cache.stats()
+
+
+"""
+    OpeningBookStrategy - WRAPPER
+    > the first shots of a game come from the opening book, without asking the inner strategy,
+      until a shot hits or the terrain leaves the book line
+    > every game plays the line through one of the 8 symmetries of the terrain, drawn when the
+      strategy is seeded or reset, so the opening isn't the same in every game
+    > keeps the name of the inner strategy (pools and snapshots see the same strategy),
+      last_turn tells the book moves apart
+
+"""
+class OpeningBookStrategy(Strategy):
+    def __init__(self, inner:Strategy, book, seed=None):
+        super().__init__(derive_seed(seed, OPENING))
+        self.inner = inner
+        self.name = inner.name
+        self.book = book
+        self.symmetry = self.rng.randrange(len(SYMMETRIES))
+
+    def seed(self, seed):
+        self.rng.seed(derive_seed(seed, OPENING))
+        self.symmetry = self.rng.randrange(len(SYMMETRIES))
+        self.inner.seed(seed)
+
+    def reset(self):
+        self.symmetry = self.rng.randrange(len(SYMMETRIES))
+        self.inner.reset()
+
+    def close(self):
+        self.inner.close()
+
+    def snapshot(self):
+        return {**self.inner.snapshot(), "book": {"rng": rng_state(self.rng), "symmetry": self.symmetry}}
+
+    def restore(self, state:dict):
+        self.inner.restore(state)
+        if "book" in state:
+            set_rng_state(self.rng, state["book"]["rng"])
+            self.symmetry = state["book"]["symmetry"]
+
+    def book_move(self, board, difficulty:int):
+        # the Move of the book for this terrain, None out of the book
+        if board.hits:
+            return None
+        geometry = board.geometry
+        # self.symmetry is drawn once per game, picked between the symmetries the line allows
+        symmetries = self.book.symmetries(geometry.squares, difficulty)
+        if not symmetries:
+            return None
+        symmetry = symmetries[self.symmetry % len(symmetries)]
+        attacked = geometry.transform_mask(board.attacked, geometry.inverse_symmetry(symmetry))
+        cell = self.book.position(geometry.squares, difficulty, attacked)
+        if cell is None or not self.book.matches_fleet(board):
+            return None
+        return Move(BOMB, *geometry.transform_cell(*cell, symmetry))
+
+    def next_move(self, board, difficulty:int) -> Move:
+        move = self.book_move(board, difficulty)
+        if move is not None:
+            self.last_turn = {"book": True}
+            return move
+        move = self.inner.next_move(board, difficulty)
+        self.last_turn = self.inner.last_turn
+        return move
+
+
+# REGISTRY
+STRATEGIES = {
+    HuntTargetStrategy.name: HuntTargetStrategy,
+    ClipsStrategy.name: ClipsStrategy,
+    MonteCarloStrategy.name: MonteCarloStrategy,
+}
+
+# cheap Python path for the easy level, the expert system on the middle one,
+# the sampler on the hard level, where the rules would read the real ship positions
+DIFFICULTY_STRATEGY = {
+    1: HuntTargetStrategy.name,
+    2: ClipsStrategy.name,
+    3: MonteCarloStrategy.name,
+}
+
+def get_strategy(difficulty:int=1, name=None, cache_size:int=0, book=None, **kwargs):
+    # book: an OpeningBook played before the strategy, see game_opening
+    name = name or DIFFICULTY_STRATEGY[int(difficulty)]
+    if name not in STRATEGIES:
+        raise ValueError(f"Unknown strategy {name}, available: {', '.join(STRATEGIES)}")
+    strategy = STRATEGIES[name](**kwargs)
+    if cache_size:
+        strategy = CachedStrategy(strategy, cache_size)
+    if book is not None:
+        strategy = OpeningBookStrategy(strategy, book, kwargs.get("seed"))
+    return strategy
+
+
+# LOCAL MAIN
+if __name__ == "__main__":
+    import sys
+    import time
+    import zlib
+    from game_bitboard import Bitboard
+    from game_placement import FleetGenerator, ENEMY_FLEET
+    from game_seed import FLEET, STRATEGY
+
+    name = sys.argv[1] if len(sys.argv) > 1 else HuntTargetStrategy.name
+    difficulty = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    games = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+    cache_size = int(sys.argv[4]) if len(sys.argv) > 4 else 0
+    run_seed = int(sys.argv[5]) if len(sys.argv) > 5 else 0
+    # the sampler counts tries instead of time, so two runs with the same seed give the same moves
+    options = {"attempts": REPRODUCIBLE_ATTEMPTS, "workers": 1} if name == MonteCarloStrategy.name else {}
+    generator = FleetGenerator()
+    strategy = get_strategy(difficulty, name, cache_size, **options)
+
+    start = time.perf_counter()
+    total = 0
+    digest = 0
+    for game in range(games):
+        game_seed = derive_seed(run_seed, str(game))
+        generator.seed(derive_seed(game_seed, FLEET))
+        strategy.seed(derive_seed(game_seed, STRATEGY))
+        board = Bitboard()
+        for ship_id, (x, y, size, orientation) in enumerate(generator.generate(ENEMY_FLEET), start=1):
+            board.place(x, y, size, orientation, ship_id)
+        strategy.reset()
+        trace = []
+        total += play_game(strategy, board, difficulty, trace=trace)
+        digest = zlib.crc32(repr(trace).encode(), digest)
+    elapsed = time.perf_counter() - start
+    print(f"{name} on level {difficulty}: {total / games:.1f} moves/game, {games / elapsed:.1f} games/s, trace {digest:08x}")
+    if cache_size:
+        print(strategy.stats())
+    strategy.close()
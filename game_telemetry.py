@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 27 10:18:44 2026
+
+@authors: Catalin.BUTACU, Serban.VICOL, Nicu.TARADACIUC
+"""
+
+# LIBS
+import json
+import os
+import queue
+import threading
+import time
+
+# GLOBALS
+TELEMETRY_FILE = "telemetry/moves.jsonl"
+MAX_BYTES = 16 * 1024 * 1024   # a JSONL file is rotated past this size
+BACKUPS = 5                    # rotated files kept: moves.jsonl.1 ... moves.jsonl.5
+BATCH_ROWS = 4096              # rows in one Parquet part
+QUEUE_SIZE = 65536             # records waiting for the writer, the next ones are dropped
+
+JSONL = "jsonl"
+PARQUET = "parquet"
+
+
+def parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+"""
+    TelemetrySink
+    > per move records (dicts) written by a background thread, record() never blocks the game
+    > JSONL by default, rotated by size; Parquet parts when pyarrow is installed and asked for
+    > a full queue drops records instead of waiting, dropped counts them
+
+"""
+class TelemetrySink:
+    def __init__(self, path:str=TELEMETRY_FILE, fmt=None, max_bytes:int=MAX_BYTES, backups:int=BACKUPS):
+        self.fmt = fmt or JSONL
+        if self.fmt == PARQUET and not parquet_available():
+            self.fmt = JSONL
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.queue = queue.Queue(QUEUE_SIZE)
+        self.dropped = 0
+        self.written = 0
+        self.parts = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.thread = threading.Thread(target=self.writer, name="telemetry", daemon=True)
+        self.thread.start()
+
+    def record(self, **fields):
+        fields.setdefault("time", time.time())
+        try:
+            self.queue.put_nowait(fields)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+
+    # WRITER THREAD
+    def writer(self):
+        rows = []
+        while True:
+            item = self.queue.get()
+            if item is not None:
+                rows.append(item)
+            # take what is already waiting, one write for the whole batch
+            while item is not None and len(rows) < BATCH_ROWS:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None:
+                    rows.append(item)
+            if rows and (item is None or self.fmt == JSONL or len(rows) >= BATCH_ROWS):
+                self.write(rows)
+                rows = []
+            if item is None:
+                return
+
+    def write(self, rows):
+        if self.fmt == PARQUET:
+            self.write_parquet(rows)
+        else:
+            self.write_jsonl(rows)
+        self.written += len(rows)
+
+    def write_jsonl(self, rows):
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write(''.join(json.dumps(row) + "\n" for row in rows))
+            size = file.tell()
+        if size > self.max_bytes:
+            self.rotate(self.path)
+
+    def write_parquet(self, rows):
+        import pyarrow
+        import pyarrow.parquet
+        base, _ = os.path.splitext(self.path)
+        part = f"{base}-{self.parts:05d}.parquet"
+        pyarrow.parquet.write_table(pyarrow.Table.from_pylist(rows), part)
+        self.parts += 1
+        stale = f"{base}-{self.parts - 1 - self.backups:05d}.parquet"
+        if self.parts > self.backups and os.path.exists(stale):
+            os.remove(stale)
+
+    def rotate(self, path):
+        for index in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{path}.{index}"):
+                os.replace(f"{path}.{index}", f"{path}.{index + 1}")
+        if self.backups:
+            os.replace(path, f"{path}.1")
+        else:
+            os.remove(path)
+
+
+"""
+    NullSink
+    > same interface, nothing recorded; the default when telemetry is off
+
+"""
+class NullSink:
+    dropped = 0
+    written = 0
+
+    def record(self, **fields):
+        pass
+
+    def close(self):
+        pass
+
+
+# HELPERS
+def record_move(sink, strategy, difficulty:int, move, result, latency:float, **context):
+    # one system move: who decided it, what it cost (strategy.last_turn) and what it hit
+    sink.record(strategy=strategy.name, difficulty=difficulty, ability=move.ability, row=move.row, col=move.col,
+                result=result, latency_ms=1000 * latency, **strategy.last_turn, **context)
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 30 09:14:26 2026
+
+@authors: Catalin.BUTACU, Serban.VICOL, Nicu.TARADACIUC
+"""
+
+# LIBS
+import itertools
+import math
+import time
+from collections import namedtuple
+from statistics import NormalDist
+
+from game_bitboard import Bitboard
+from game_golden import strategy_options, RULES_FILE
+from game_placement import FleetGenerator, ENEMY_FLEET
+from game_seed import derive_seed, FLEET, STRATEGY
+from game_strategy import get_strategy, play_game, DIFFICULTY_STRATEGY
+
+# GLOBALS
+DELTA = 1.0         # smallest difference in mean shots to win worth detecting
+ALPHA = 0.05        # chance to call a difference that isn't there, split between the two directions
+BETA = 0.05         # chance to miss a difference of DELTA
+MIN_GAMES = 16      # games before the first decision, the variance needs a few pairs
+MAX_GAMES = 2000
+MIN_VARIANCE = 0.25 # shots are integers, identical strategies would give a variance of 0
+
+A_BETTER = "A"
+B_BETTER = "B"
+EQUAL = "equal"
+
+# name (a key of STRATEGIES), the dificultate given to it, the rule base for the CLIPS one
+Contestant = namedtuple("Contestant", "name difficulty rules")
+
+
+# CONTESTANTS
+def parse_contestant(spec:str):
+    # name[:level][@rules.clp], or only the level: "2", "clips:3", "clips:2@variant.clp", "monte_carlo"
+    spec, _, rules = spec.partition("@")
+    name, _, level = spec.partition(":")
+    if name.isdigit():
+        name, level = DIFFICULTY_STRATEGY[int(name)], name
+    difficulty = int(level) if level else next((d for d, strategy in DIFFICULTY_STRATEGY.items() if strategy == name), 1)
+    return Contestant(name, difficulty, rules or RULES_FILE)
+
+def contestant_label(contestant:Contestant):
+    label = f"{contestant.name}:{contestant.difficulty}"
+    return label if contestant.rules == RULES_FILE else f"{label}@{contestant.rules}"
+
+def make_strategy(contestant:Contestant):
+    return get_strategy(contestant.difficulty, contestant.name, **strategy_options(contestant.name, contestant.rules))
+
+def shots_to_win(strategy, contestant:Contestant, game_seed:int, fleet=ENEMY_FLEET):
+    # the fleet of init_ships for this game seed; both contestants of a pair get the same fleet and strategy seed
+    board = Bitboard()
+    generator = FleetGenerator(seed=derive_seed(game_seed, FLEET))
+    for ship_id, (x, y, size, orientation) in enumerate(generator.generate(fleet), start=1):
+        board.place(x, y, size, orientation, ship_id)
+    strategy.seed(derive_seed(game_seed, STRATEGY))
+    strategy.reset()
+    return play_game(strategy, board, contestant.difficulty)
+
+
+"""
+    SequentialTest - SPRT
+    > paired differences d = shots(A) - shots(B) on the same fleets, normal with the variance estimated so far
+    > two Wald tests at once: mean 0 against +delta and mean 0 against -delta, ALPHA split between them
+    > stops on the first bound crossed: B better (A needs more shots), A better, or equal when both
+      tests accept mean 0; None while undecided
+
+"""
+class SequentialTest:
+    def __init__(self, delta:float=DELTA, alpha:float=ALPHA, beta:float=BETA, min_games:int=MIN_GAMES):
+        self.delta = delta
+        self.min_games = min_games
+        self.upper = math.log((1 - beta) / (alpha / 2))
+        self.lower = math.log(beta / (1 - alpha / 2))
+        self.games = 0
+        self.total = 0.0
+        self.squares = 0.0
+
+    def add(self, difference:float):
+        self.games += 1
+        self.total += difference
+        self.squares += difference * difference
+
+    @property
+    def mean(self):
+        return self.total / self.games if self.games else 0.0
+
+    @property
+    def variance(self):
+        if self.games < 2:
+            return MIN_VARIANCE
+        return max((self.squares - self.games * self.mean ** 2) / (self.games - 1), MIN_VARIANCE)
+
+    def llr(self):
+        # log likelihood ratios of +delta and -delta against 0
+        shift = self.games * self.delta ** 2 / 2
+        scale = self.delta / self.variance
+        return scale * self.total - shift / self.variance, -scale * self.total - shift / self.variance
+
+    def decision(self):
+        if self.games < self.min_games:
+            return None
+        worse, better = self.llr()
+        if worse >= self.upper:
+            return B_BETTER
+        if better >= self.upper:
+            return A_BETTER
+        if worse <= self.lower and better <= self.lower:
+            return EQUAL
+        return None
+
+    def fixed_games(self, alpha:float=ALPHA, beta:float=BETA):
+        # games a fixed size paired test would need for the same errors, with the variance seen here
+        z = NormalDist().inv_cdf(1 - alpha / 2) + NormalDist().inv_cdf(1 - beta)
+        return math.ceil((z * math.sqrt(self.variance) / self.delta) ** 2)
+
+
+# TOURNAMENT
+def run_match(a:Contestant, b:Contestant, delta:float=DELTA, alpha:float=ALPHA, beta:float=BETA,
+              max_games:int=MAX_GAMES, run_seed:int=0):
+    # paired games until the sequential test decides or max_games are played
+    test = SequentialTest(delta, alpha, beta)
+    strategy_a, strategy_b = make_strategy(a), make_strategy(b)
+    total_a = total_b = 0
+    decision = None
+    start = time.perf_counter()
+    try:
+        for game in range(max_games):
+            game_seed = derive_seed(run_seed, str(game))
+            shots_a = shots_to_win(strategy_a, a, game_seed)
+            shots_b = shots_to_win(strategy_b, b, game_seed)
+            total_a += shots_a
+            total_b += shots_b
+            test.add(shots_a - shots_b)
+            decision = test.decision()
+            if decision is not None:
+                break
+    finally:
+        strategy_a.close()
+        strategy_b.close()
+    return {
+        "a": contestant_label(a),
+        "b": contestant_label(b),
+        "games": test.games,
+        "mean_a": total_a / test.games,
+        "mean_b": total_b / test.games,
+        "mean_difference": test.mean,
+        "variance": test.variance,
+        "llr": test.llr(),
+        "decision": decision,
+        "fixed_games": test.fixed_games(alpha, beta),
+        "elapsed": time.perf_counter() - start,
+    }
+
+def round_robin(contestants, **kwargs):
+    for a, b in itertools.combinations(contestants, 2):
+        yield run_match(a, b, **kwargs)
+
+def format_match(match:dict):
+    decision = {A_BETTER: f"{match['a']} better", B_BETTER: f"{match['b']} better",
+                EQUAL: "no difference", None: "undecided"}[match["decision"]]
+    return (f"{match['a']} vs {match['b']}: {decision} after {match['games']} games "
+            f"({match['mean_a']:.2f} vs {match['mean_b']:.2f} shots, difference {match['mean_difference']:+.2f}, "
+            f"sd {math.sqrt(match['variance']):.2f}); a fixed size test needs {match['fixed_games']} games, "
+            f"{match['elapsed']:.1f}s")
+
+
+# LOCAL MAIN
+if __name__ == "__main__":
+    import sys
+    specs = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    options = dict(arg[2:].split("=", 1) for arg in sys.argv[1:] if arg.startswith("--") and "=" in arg)
+    if len(specs) < 2:
+        raise SystemExit("Usage: game_tournament.py <contestant> <contestant> [...] [--delta=1.0] [--max_games=2000] [--seed=0]"
+                         "\n  contestant: level, name, name:level or name:level@rules.clp")
+    contestants = [parse_contestant(spec) for spec in specs]
+    for match in round_robin(contestants, delta=float(options.get("delta", DELTA)),
+                             max_games=int(options.get("max_games", MAX_GAMES)), run_seed=int(options.get("seed", 0))):
+        print(format_match(match))
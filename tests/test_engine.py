@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Nov  6 09:40:03 2026
+
+@authors: Catalin.BUTACU, Serban.VICOL, Nicu.TARADACIUC
+"""
+
+# LIBS
+import os
+
+import pytest
+
+clips = pytest.importorskip("clips")
+
+from conftest import ROOT
+from game_bitboard import Bitboard
+from game_engine import init_sistem_env, get_env, write_matrix_to_file, terrain_facts, execute_set_difficulty
+from game_engine import execute_update_file_map_using_matrix, execute_update_matrix_using_file_map
+from game_engine import execute_external_attacks, execute_seed, execute_snapshot, execute_restore
+from game_golden import fleet_board
+from game_snapshot import dumps, loads
+
+RULES_FILE = os.path.join(ROOT, "main.clp")
+
+
+# HELPERS
+def teren_facts(env):
+    return {str(fact) for fact in env.facts() if fact.template.name == "Teren"}
+
+def expected_teren_facts(board):
+    env = clips.Environment()
+    env.load(RULES_FILE)
+    env.eval(terrain_facts(board))
+    return teren_facts(env)
+
+def attacked_board(seed:int=7):
+    # a miss, a hit and a sunk ship, like the opening book and the first turns leave the terrain
+    board = fleet_board(seed)
+    geometry = board.geometry
+    board.bomb(*geometry.first_cell(geometry.full & ~board.ships))
+    small = min(board.ship_masks.values(), key=lambda mask: bin(mask).count("1"))
+    big = max(board.ship_masks.values(), key=lambda mask: bin(mask).count("1"))
+    for x, y in geometry.iter_cells(small):
+        board.bomb(x, y)
+    board.bomb(*geometry.first_cell(big))
+    return board
+
+@pytest.fixture
+def ui_env(tmp_path, monkeypatch):
+    # the environment of the UI, with its map files in a temporary folder
+    monkeypatch.chdir(tmp_path)
+    init_sistem_env(RULES_FILE)
+    execute_set_difficulty(2)
+    return get_env()
+
+
+# TESTS
+def test_map_start_keeps_attacked_ships(ui_env):
+    board = attacked_board()
+    write_matrix_to_file("map_start.txt", board.to_matrix())
+    # Rule_Opening_File_Read and Rule_Reading_Map, before any rule of the system
+    ui_env.run(2)
+    assert teren_facts(ui_env) == expected_teren_facts(board)
+
+def test_fallback_attack_survives_the_next_clips_turn(ui_env):
+    board = fleet_board(7)
+    execute_update_file_map_using_matrix(board.to_matrix(), board, load_terrain=True)
+    board = Bitboard.from_matrix(execute_update_matrix_using_file_map())
+
+    # the fallback bombs a cell the rules didn't attack, only on the Bitboard of the UI
+    geometry = board.geometry
+    cell = geometry.first_cell(geometry.full & ~board.attacked)
+    attacked = board.attacked
+    board.bomb(*cell)
+    execute_external_attacks(board, board.attacked & ~attacked)
+    assert teren_facts(ui_env) == expected_teren_facts(board)
+
+    execute_update_file_map_using_matrix(board.to_matrix(), board)
+    after = Bitboard.from_matrix(execute_update_matrix_using_file_map())
+    assert after.attacked & geometry.cell_mask(*cell)
+    assert after.attacked & board.attacked == board.attacked
+
+def test_ui_rule_base_resumes_from_a_snapshot(ui_env):
+    board = fleet_board(7)
+    execute_update_file_map_using_matrix(board.to_matrix(), board, load_terrain=True)
+    board = Bitboard.from_matrix(execute_update_matrix_using_file_map())
+    state = loads(dumps(execute_snapshot()))
+
+    def next_turn():
+        execute_seed(11)
+        execute_update_file_map_using_matrix(board.to_matrix(), board)
+        return Bitboard.from_matrix(execute_update_matrix_using_file_map()).attacked
+
+    expected = next_turn()
+    # back into the environment that played the turn already
+    execute_restore(state, RULES_FILE)
+    assert next_turn() == expected
+    assert expected & ~board.attacked
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Nov  6 11:02:17 2026
+
+@authors: Catalin.BUTACU, Serban.VICOL, Nicu.TARADACIUC
+"""
+
+# LIBS
+import itertools
+from collections import Counter
+
+from game_bitboard import get_geometry
+from game_golden import fleet_board
+from game_sampler import sample_configurations, ConfigurationSampler, Observation
+
+
+# HELPERS
+def layout_probabilities(squares:int, misses, open_hits, sizes):
+    # every fleet layout consistent with the observation is as likely, several layouts can cover the same cells
+    geometry = get_geometry(squares)
+    placements = [[p[3] for p in geometry.get_placements(size) if not p[3] & misses] for size in sizes]
+    counts = Counter()
+    for layout in itertools.product(*placements):
+        occupied = 0
+        for mask in layout:
+            if mask & occupied:
+                break
+            occupied |= mask
+        else:
+            if occupied & open_hits == open_hits:
+                counts[occupied] += 1
+    total = sum(counts.values())
+    return {configuration: count / total for configuration, count in counts.items()}
+
+
+# TESTS
+def test_configurations_are_uniform_over_layouts():
+    geometry = get_geometry(4)
+    misses, open_hits, sizes = geometry.cell_mask(0, 0), geometry.cell_mask(1, 1), (3, 2)
+    expected = layout_probabilities(4, misses, open_hits, sizes)
+    configurations = sample_configurations(4, misses, open_hits, 0, sizes, 0, seed=0, attempts=100000)
+    counts = Counter(configurations)
+    assert set(counts) <= set(expected)
+    total = len(configurations)
+    chi2 = sum((counts[c] - total * p) ** 2 / (total * p) for c, p in expected.items())
+    # placing the ships one after the other between the cells left gives about 5 times the degrees of freedom
+    freedom = len(expected) - 1
+    assert chi2 < freedom + 5 * (2 * freedom) ** 0.5
+
+def test_seeded_probabilities_dont_depend_on_workers():
+    board = fleet_board(3)
+    for x, y in ((0, 0), (4, 4), (5, 5), (9, 9)):
+        board.bomb(x, y)
+    observation = Observation.from_board(board)
+    results = []
+    for workers in (1, 2):
+        sampler = ConfigurationSampler(workers=workers, seed=123, attempts=400)
+        try:
+            results.append(sampler.probabilities(observation))
+        finally:
+            sampler.close()
+    assert results[0] == results[1]